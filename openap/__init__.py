@@ -2,10 +2,12 @@ from .extra import aero
 from .extra import nav
 from .extra import filters
 from .extra import statistics
+from .extra import online
 
 from .thrust import Thrust
 from .drag import Drag
 from .fuel import FuelFlow
 from .emission import Emission
 from .kinematic import WRAP
-from .phase import FlightPhase
+from .phase import FlightPhase, FlightPhaseStream
+from .trajectories import Trajectories
@@ -1,42 +1,56 @@
+from collections import deque
 from matplotlib import pyplot as plt
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from scipy.signal import gaussian
 from scipy.ndimage import filters
 from scipy.interpolate import UnivariateSpline
+from scipy.linalg import lapack
 
 
 class BaseFilter(object):
     def __init__(self, i=False):
         self.interpolate = i
 
-    def sortxy(self, X, Y):
-        XY = list(zip(X, Y))
-        XY.sort(key=lambda t: t[0])
-        X1, Y1 = list(zip(*XY))
-        return np.array(X1), np.array(Y1)
+    def sortxy(self, X, Y, *Ys):
+        ''' Sort the data by time, other channels in Ys share the same sort '''
+        X = np.asarray(X)
+        order = np.argsort(X, kind='stable')
+        return tuple([X[order]] + [np.asarray(y)[order] for y in (Y,) + Ys])
 
-    def simplefill(self, X, Y):
+    def simplefill(self, X, Y, *Ys):
         ''' Fill the missing data with closest previous data each second '''
 
-        X, Y = self.sortxy(X, Y)
+        X, *Ys = self.sortxy(X, Y, *Ys)
 
-        X = np.array(X)
-        Y = np.array(Y)
+        Xfull, index = self._fillindex(X)
 
-        Xfull = list(range(int(X[0]), int(X[-1]+1)))
         Yfull = []
+        for y in Ys:
+            if index[0] > 0:
+                Yfull.append(y[index - 1])
+            elif index[-1] > 0:
+                # zero before the first second with data
+                Yfull.append(np.concatenate(([0], y))[index])
+            else:
+                Yfull.append(np.zeros(len(Xfull), dtype=int))
+
+        return tuple([Xfull] + Yfull)
+
+    def _fillindex(self, X):
+        # each second from the first to the last time stamp, and the index
+        # (plus one) of the last data at or before it, 0 if there is none
+        Xfull = np.arange(int(X[0]), int(X[-1]+1))
 
-        y = 0
-        for x in Xfull:
-            try:
-                i = np.where(X == x)[0][0]
-                y = Y[i]
-            except:
-                pass
+        i = np.searchsorted(X, Xfull)
+        found = np.zeros(len(Xfull), dtype=bool)
+        inside = i < len(X)
+        found[inside] = X[i[inside]] == Xfull[inside]
 
-            Yfull.append(y)
+        index = np.where(found, i + 1, 0)
+        np.maximum.accumulate(index, out=index)
 
-        return np.array(Xfull), np.array(Yfull)
+        return Xfull, index
 
     def filterplot(self, x, y, xf, yf):
         plt.plot(x, y, '.', color='blue', alpha=0.5)
@@ -60,12 +74,15 @@ class SavitzkyGolay(BaseFilter):
         means only smoothing)
 
     """
+    # coefficients for each (window_size, order, deriv)
+    _coeffs = {}
+
     def __init__(self, window_size=11, order=2, deriv=0, i=False):
         super(SavitzkyGolay, self).__init__(i=i)
 
         try:
-            window_size = np.abs(np.int(window_size))
-            order = np.abs(np.int(order))
+            window_size = np.abs(int(window_size))
+            order = np.abs(int(order))
         except ValueError:
             raise ValueError("window_size and order have to be of type int")
         if window_size % 2 != 1 or window_size < 1:
@@ -77,36 +94,107 @@ class SavitzkyGolay(BaseFilter):
         self.order = order
         self.deriv = deriv
 
-    def filter(self, X, Y):
+    @classmethod
+    def coefficients(cls, window_size, order, deriv=0):
+        key = (window_size, order, deriv)
+        m = cls._coeffs.get(key)
+        if m is None:
+            half_window = (window_size - 1) // 2
+            k = np.arange(-half_window, half_window+1)
+            b = k[:, None] ** np.arange(order+1)
+            m = np.linalg.pinv(b)[deriv]
+            m.flags.writeable = False
+            cls._coeffs[key] = m
+        return m
+
+    def filter(self, X, Y, *Ys):
         if self.interpolate:
-            X, Y = self.simplefill(X, Y)
+            X, *Ys = self.simplefill(X, Y, *Ys)
         else:
-            X, Y = self.sortxy(X, Y)
+            X, *Ys = self.sortxy(X, Y, *Ys)
+
+        YF = self.filter_many(np.array(Ys, dtype=float))
+
+        return tuple([X] + list(YF))
+
+    def filter_many(self, Y, offsets=None, X=None):
+        """ Filter sorted channels of one or many flights at once
+
+        Y holds one channel, or channels in rows. X, the time stamps of the
+        samples, is not used as the samples are taken evenly spaced. Flights are stored back to
+        back, flight i covers the samples offsets[i]:offsets[i+1]. Each
+        flight is padded at its extremes with values taken from itself.
+        """
+        Y = np.asarray(Y, dtype=float)
+        Y2 = np.atleast_2d(Y)
+        n = Y2.shape[1]
+
+        if n == 0:
+            return Y.copy()
+
+        if offsets is None:
+            offsets = [0, n]
+        offsets = np.asarray(offsets, dtype=int)
+        lo, hi = offsets[:-1], offsets[1:]
+        lengths = hi - lo
+
+        m = self.coefficients(self.window_size, self.order, self.deriv)
+        h = (self.window_size - 1) // 2
+
+        # index of the source sample of each padded sample, flights are
+        # padded with h samples on each side
+        plen = lengths + 2 * h
+        pstart = np.concatenate([[0], np.cumsum(plen)])
+        flight = np.repeat(np.arange(len(lengths)), plen)
+        j = np.arange(pstart[-1]) - pstart[flight] - h
+
+        # mirrored around the first and last sample of the flight
+        end = lengths[flight] - 1
+        left, right = j < 0, j > end
+        j = np.where(left, -j, np.where(right, 2 * end - j, j))
+        src = np.minimum(lo[flight] + np.clip(j, 0, np.maximum(end, 0)), n - 1)
 
-        order_range = list(range(self.order+1))
-        half_window = (self.window_size - 1) // 2
-        # precompute coefficients
-        b = np.mat([[k**i for i in order_range]
-                    for k in range(-half_window, half_window+1)])
-        m = np.linalg.pinv(b).A[self.deriv]
-        # pad the signal at the extremes with
-        # values taken from the signal itself
-        firstvals = Y[0] - np.abs(Y[1:half_window+1][::-1] - Y[0])
-        lastvals = Y[-1] + np.abs(Y[-half_window-1:-1][::-1] - Y[-1])
-        Y1 = np.concatenate((firstvals, Y, lastvals))
-        Y2 = np.convolve(m, Y1, mode='valid')
+        P = Y2[:, src]
+        first = Y2[:, np.minimum(lo, n - 1)][:, flight]
+        last = Y2[:, np.maximum(hi - 1, 0)][:, flight]
+        P[:, left] = first[:, left] - np.abs(P[:, left] - first[:, left])
+        P[:, right] = last[:, right] + np.abs(P[:, right] - last[:, right])
 
-        return X, Y2
+        # one convolution of all channels and flights
+        YF = sliding_window_view(P, self.window_size, axis=1) @ m[::-1]
+
+        # filtered samples of each flight
+        sample = np.arange(n) - np.repeat(lo, lengths)
+        YF = YF[:, np.repeat(pstart[:-1], lengths) + sample]
+
+        return YF.reshape(Y.shape)
 
 
 class Spline(BaseFilter):
     """
     Spline smoothing
 
+    Parameters
+    ----------
+    k : int
+        degree of the spline
+    segment : int
+        number of samples of each window, to fit long series in overlapping
+        windows instead of a single spline (default = None, single spline)
+    overlap : int
+        number of samples shared by consecutive windows, the windows are
+        blended linearly over them (default = segment // 4)
+    workers : int
+        number of processes fitting the windows (default = None, in the
+        current process)
+
     """
-    def __init__(self, k=1, i=False):
+    def __init__(self, k=1, i=False, segment=None, overlap=None, workers=None):
         super(Spline, self).__init__(i=i)
         self.k = k
+        self.segment = segment
+        self.overlap = overlap
+        self.workers = workers
 
     def kernel(self, series, sigma=3):
         # fix the weight of data
@@ -124,16 +212,72 @@ class Spline(BaseFilter):
 
         # using gaussian kernel to get a better variances
         avg, var = self.kernel(Y)
-        spl = UnivariateSpline(X, Y, k=self.k, w=1/np.sqrt(var))
+        W = 1/np.sqrt(var)
 
         if self.interpolate:
             xmax = X[-1]
-            Xfull = np.arange(xmax)
-            Yfull = spl(Xfull)
-            return Xfull, Yfull
+            Xout = np.arange(xmax)
         else:
-            Y1 = spl(X)
-            return X, Y1
+            Xout = X
+
+        if self.segment is None or len(X) <= self.segment:
+            spl = UnivariateSpline(X, Y, k=self.k, w=W)
+            return Xout, spl(Xout)
+
+        return Xout, self._segmented(X, Y, W, Xout)
+
+    def _segmented(self, X, Y, W, Xout):
+        n = len(X)
+        overlap = self.segment // 4 if self.overlap is None else self.overlap
+        overlap = max(2, min(overlap, self.segment // 2))
+        step = self.segment - overlap
+
+        starts = np.arange(0, n - overlap, step)
+        ends = np.minimum(starts + self.segment, n)
+        starts = np.maximum(np.minimum(starts, ends - self.segment), 0)
+
+        # output points of each window, the first and last windows also
+        # cover the output points outside of the data
+        lo = np.searchsorted(Xout, X[starts], side='left')
+        hi = np.searchsorted(Xout, X[ends - 1], side='right')
+        lo[0], hi[-1] = 0, len(Xout)
+
+        tasks = [
+            (X[s:e], Y[s:e], W[s:e], self.k, Xout[a:b])
+            for s, e, a, b in zip(starts, ends, lo, hi)
+        ]
+
+        if self.workers and self.workers > 1 and len(tasks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                fits = list(executor.map(_spline_fit, *zip(*tasks)))
+        else:
+            fits = [_spline_fit(*task) for task in tasks]
+
+        # linear blending over the samples shared with the next window
+        Yout = np.zeros(len(Xout))
+        Wout = np.zeros(len(Xout))
+
+        for w, (s, e, a, b) in enumerate(zip(starts, ends, lo, hi)):
+            q = Xout[a:b]
+            weight = np.ones(len(q))
+            if w > 0:
+                x0, x1 = X[s], X[ends[w - 1] - 1]
+                weight = np.minimum(weight, np.clip((q - x0) / max(x1 - x0, 1e-9), 0, 1))
+            if w < len(starts) - 1:
+                x0, x1 = X[starts[w + 1]], X[e - 1]
+                weight = np.minimum(weight, np.clip((x1 - q) / max(x1 - x0, 1e-9), 0, 1))
+            Yout[a:b] += weight * fits[w]
+            Wout[a:b] += weight
+
+        return Yout / Wout
+
+
+def _spline_fit(X, Y, W, k, Xout):
+    # fit and evaluate the spline of one window
+    spl = UnivariateSpline(X, Y, k=k, w=W)
+    return spl(Xout)
 
 
 class TWF(BaseFilter):
@@ -145,22 +289,120 @@ class TWF(BaseFilter):
         super(TWF, self).__init__()
         self.window_size = window_size
 
-    def filter(self, X, Y):
-        X, Y = self.sortxy(X, Y)
+    def filter(self, X, Y, *Ys):
+        X, *Ys = self.sortxy(X, Y, *Ys)
+
+        YF = self.filter_many(np.array(Ys, dtype=float), X=X)
+
+        return tuple([X] + list(YF))
+
+    def filter_many(self, Y, offsets=None, X=None):
+        """ Filter sorted channels of one or many flights at once
+
+        Y holds one channel, or channels in rows, X the time stamps of the
+        samples (unit steps if not given). Flights are stored back to back,
+        flight i covers the samples offsets[i]:offsets[i+1].
+
+        Each output is the mean of the new sample and of a weighted average
+        of the previous outputs of the flight, so the filter is a linear
+        recursion. Its coefficients are set up at once as a lower triangular
+        band matrix, with no entries across flights, and the recursion is
+        solved for all channels and flights by one LAPACK banded triangular
+        solve.
+        """
+        Y = np.asarray(Y, dtype=float)
+        Y2 = np.atleast_2d(Y)
+        n = Y2.shape[1]
+
+        if n == 0:
+            return Y.copy()
+
+        if offsets is None:
+            offsets = [0, n]
+        offsets = np.asarray(offsets, dtype=int)
+        lo, hi = offsets[:-1], offsets[1:]
+
+        # index of each sample within its flight
+        l = np.arange(n) - np.repeat(lo, hi - lo)
+
+        w = self.window_size
 
-        YF = np.zeros(Y.shape)
-        YF[0] = Y[0]
-        YF[1] = Y[1]
+        # band storage of the recursion YF[i] - 0.5 * sum(c * YF[j]) = 0.5 * Y[i],
+        # AB[d, i-d] holds the coefficient of YF[i-d] in row i
+        kd = max(w, 2)
+        AB = np.zeros((kd + 1, n))
+        AB[0] = 1.0
 
-        for i in range(2, len(X)):
-            if i < self.window_size:
-                y = (np.average(YF[:i-1]) + Y[i]) / 2.0
+        # first samples, average of all previous outputs but the last one
+        early = (l >= 2) & (l < w)
+        for d in range(2, w):
+            rows = np.flatnonzero(early & (l >= d))
+            AB[d, rows-d] = -0.5 / (l[rows] - 1)
+
+        rows = np.flatnonzero(l >= max(w, 2))
+
+        if len(rows):
+            if X is None:
+                X = np.arange(n, dtype=float)
+            X = np.asarray(X, dtype=float)
+
+            # inverse time steps in each window, from the most recent sample
+            dXinv = 1. / (X[:-1] - X[1:])
+            if w > 2:
+                W = sliding_window_view(dXinv, w-2)[rows-w, ::-1]
             else:
-                Xwin = X[i-self.window_size: i-1][::-1]
-                Ywin = YF[i-self.window_size: i-1][::-1]
-                dXwin = Xwin[1:] - Xwin[:-1]
-                yw = (Ywin[0] + np.sum(1./dXwin * Ywin[1:])) / \
-                     (1 + np.sum(1.0/dXwin))
-                y = (yw + Y[i]) / 2.0
-            YF[i] = y
-        return X, np.array(YF)
+                W = np.zeros((len(rows), 0))
+            norm = 1 + np.sum(W, axis=1)
+
+            AB[2, rows-2] = -0.5 / norm
+            for k in range(W.shape[1]):
+                AB[3+k, rows-3-k] = -0.5 * W[:, k] / norm
+
+        # channels in columns, filtered together with the same time steps
+        B = Y2.T * 0.5
+        B[l < 2] = Y2.T[l < 2]
+
+        YF, info = lapack.dtbtrs(AB, B, uplo='L', diag='U')
+
+        return np.ascontiguousarray(YF.T).reshape(Y.shape)
+
+
+class TWFStream(TWF):
+    """
+    Time-based weighted filter, one sample at a time
+
+    Only the last window_size samples are kept, so that one object can
+    follow a live channel (for example, the altitude of one aircraft)
+    with constant memory. Samples must arrive in time order, the output
+    is the same as TWF.filter() on the whole series, up to rounding.
+    """
+    def __init__(self, window_size=10):
+        super(TWFStream, self).__init__(window_size=window_size)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.Xbuf = deque(maxlen=self.window_size)
+        self.YFbuf = deque(maxlen=self.window_size)
+
+    def update(self, x, y):
+        i = self.count
+        w = self.window_size
+
+        if i < 2:
+            yf = y
+        elif i < w:
+            yf = (np.average(np.array(self.YFbuf)[:i-1]) + y) / 2.0
+        else:
+            Xwin = np.array(self.Xbuf)[-w:-1][::-1]
+            Ywin = np.array(self.YFbuf)[-w:-1][::-1]
+            dXwin = Xwin[1:] - Xwin[:-1]
+            yw = (Ywin[0] + np.sum(1./dXwin * Ywin[1:])) / \
+                 (1 + np.sum(1.0/dXwin))
+            yf = (yw + y) / 2.0
+
+        self.Xbuf.append(x)
+        self.YFbuf.append(float(yf))
+        self.count += 1
+
+        return float(yf)
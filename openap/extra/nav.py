@@ -1,139 +1,833 @@
-"""Navigation module helps accessing the navigation databases."""
+"""Navigation module helps accessing the navigation databases.
+
+Airports, fixes and navaids (VOR, NDB, DME, ILS, etc.) are loaded once on
+first use, with name and spatial indexes shared between threads.
+"""
 
 import os
+import glob
+import threading
 import pandas as pd
 import numpy as np
+from scipy.spatial import cKDTree
 from openap.extra import aero
 
 fixes = None
 airports = None
+navaids = None
+
+_lock = threading.RLock()
+_cache = {}
 
 curr_path = os.path.dirname(os.path.realpath(__file__))
 db_airport = curr_path + "/../data/nav/airports.csv"
 db_fix = curr_path + "/../data/nav/fix.dat"
+db_navaid = curr_path + "/../data/nav/nav.dat"
+
+dir_cache = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "openap",
+)
 
 
 def _read_fix():
-    return pd.read_csv(
+    # the parsed table is cached as a binary file, memory-mapped on later
+    # runs, and invalidated when the size or the mtime of fix.dat changes
+    stat = os.stat(db_fix)
+    cache = os.path.join(dir_cache, f"fix-{stat.st_size}-{stat.st_mtime_ns}.npy")
+
+    try:
+        arr = np.load(cache, mmap_mode="r")
+        return pd.DataFrame(
+            {
+                "lat": np.array(arr["lat"]),
+                "lon": np.array(arr["lon"]),
+                "fix": arr["fix"].astype(object),
+            }
+        )
+    except (OSError, ValueError, KeyError):
+        pass
+
+    df = _parse_fix()
+
+    arr = np.empty(
+        df.shape[0],
+        dtype=[("lat", "f8"), ("lon", "f8"), ("fix", f"U{df.fix.str.len().max()}")],
+    )
+    arr["lat"], arr["lon"], arr["fix"] = df["lat"], df["lon"], df["fix"]
+
+    try:
+        os.makedirs(dir_cache, exist_ok=True)
+        for f in glob.glob(os.path.join(dir_cache, "fix-*.npy")):
+            os.remove(f)
+        tmp = f"{cache}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, cache)
+    except OSError:
+        pass
+
+    return df
+
+
+def _parse_fix():
+    df = pd.read_csv(
         db_fix,
         skiprows=3,
-        skipfooter=1,
-        engine="python",
         sep=r"\s+",
         names=("lat", "lon", "fix"),
-        encoding="unicode_escape",
+        dtype={"lat": float, "lon": float, "fix": str},
+        keep_default_na=False,
+        na_values={"lat": "", "lon": ""},
+        encoding="latin-1",
     )
+    # drop the end of file marker (99)
+    return df.dropna().reset_index(drop=True)
 
 
 def _read_airport():
     return pd.read_csv(db_airport)
 
 
+navaid_types = {
+    2: "NDB",
+    3: "VOR",
+    4: "ILS",
+    5: "LOC",
+    6: "GS",
+    7: "OM",
+    8: "MM",
+    9: "IM",
+    12: "DME",
+    13: "DME",
+}
+
+
+def _read_navaid():
+    with open(db_navaid, encoding="latin-1") as f:
+        lines = pd.Series(f.read().splitlines()[3:])
+
+    cols = lines.str.split(n=8, expand=True)
+    cols = cols[cols[0].isin([str(k) for k in navaid_types])]
+
+    # skip the few malformed records (missing fields)
+    num = cols[[1, 2, 3, 4, 5, 6]].apply(pd.to_numeric, errors="coerce")
+    valid = num.notnull().all(axis=1).values
+    cols, num = cols[valid], num[valid]
+
+    code = cols[0].astype(int).values
+    freq = num[4].values
+    extra = num[6].values
+    rest = cols[8].fillna("")
+
+    # localizers, glide slopes, markers and DME-ILS refer to a runway
+    rwy = np.isin(code, [4, 5, 6, 7, 8, 9]) | rest.str.endswith("DME-ILS").values
+    parts = rest.str.split(n=2, expand=True).reindex(columns=[0, 1, 2])
+
+    df = pd.DataFrame(
+        {
+            "type": pd.Series(code).map(navaid_types).values,
+            "ident": cols[7].values,
+            "lat": num[1].values,
+            "lon": num[2].values,
+            "elev": num[3].values,
+            # NDB in kHz, others in 10 kHz
+            "freq": np.where(code == 2, freq / 1000, freq / 100),
+            "range": num[5].values,
+            "heading": np.where(
+                np.isin(code, [4, 5, 7, 8, 9]),
+                extra,
+                # glide slopes pack the angle and the heading, 3 decimals
+                np.where(code == 6, np.round(extra % 1000, 3), np.nan),
+            ),
+            "gs_angle": np.where(code == 6, extra // 1000 / 100, np.nan),
+            "variation": np.where(code == 3, extra, np.nan),
+            "dme_bias": np.where(np.isin(code, [12, 13]), extra, np.nan),
+            "airport": np.where(rwy, parts[0].values, None),
+            "runway": np.where(rwy, parts[1].values, None),
+            "name": np.where(rwy, parts[2].values, rest.values),
+        }
+    )
+    df.loc[df["freq"] == 0, "freq"] = np.nan
+    return df
+
+
+def _get_airports():
+    global airports
+
+    if airports is None:
+        with _lock:
+            if airports is None:
+                airports = _read_airport()
+    return airports
+
+
+def _get_fixes():
+    global fixes
+
+    if fixes is None:
+        with _lock:
+            if fixes is None:
+                fixes = _read_fix()
+    return fixes
+
+
+def _get_navaids():
+    global navaids
+
+    if navaids is None:
+        with _lock:
+            if navaids is None:
+                navaids = _read_navaid()
+    return navaids
+
+
+def _cached(key, build):
+    # load-once cache of derived structures, safe to share between threads
+    value = _cache.get(key)
+    if value is None:
+        with _lock:
+            value = _cache.get(key)
+            if value is None:
+                value = _cache[key] = build()
+    return value
+
+
+def _airport_index():
+    # hash index from ICAO code to row number
+    return _cached("airport_name", lambda: pd.Index(_get_airports()["icao"]))
+
+
+def _name_index(key, get_names):
+    # hash index from name to row numbers, names can be duplicated
+    def build():
+        names = get_names()
+        first = pd.Index(names.drop_duplicates())
+        rows = names.groupby(names, sort=False).indices
+        duplicated = {k: v for k, v in rows.items() if len(v) > 1}
+        return first, names.index[~names.duplicated()].values, duplicated
+
+    return _cached(key + "_name", build)
+
+
+def _fix_index():
+    return _name_index("fix", lambda: _get_fixes()["fix"])
+
+
+def _navaid_index():
+    return _name_index("navaid", lambda: _get_navaids()["ident"])
+
+
+def _lookup_rows(df, index, names, lat=None, lon=None):
+    # first row of each name, or the closest one to the reference positions
+    first, first_rows, duplicated = index
+
+    i = first.get_indexer(names)
+    rows = np.where(i < 0, -1, first_rows[i])
+
+    if lat is not None and lon is not None:
+        lat, lon = np.broadcast_to(lat, names.shape), np.broadcast_to(lon, names.shape)
+        for j in np.flatnonzero(np.isin(names, list(duplicated))):
+            candidates = duplicated[names[j]]
+            dist = aero.distance(
+                lat[j],
+                lon[j],
+                df["lat"].values[candidates],
+                df["lon"].values[candidates],
+            )
+            rows[j] = candidates[np.argmin(dist)]
+
+    return rows
+
+
+def _candidates(df, index, name, lat=None, lon=None):
+    first, first_rows, duplicated = index
+
+    rows = duplicated.get(name)
+    if rows is None:
+        i = first.get_indexer([name])[0]
+        rows = [] if i < 0 else [first_rows[i]]
+
+    df = df.iloc[rows]
+    if lat is not None and lon is not None:
+        dist = aero.distance(lat, lon, df["lat"].values, df["lon"].values)
+        df = df.assign(distance=dist).sort_values("distance")
+    return df
+
+
+class _SpatialIndex(object):
+    """KD-tree over the unit vectors of the positions of a table."""
+
+    def __init__(self, lat, lon):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.tree = cKDTree(np.column_stack(aero._xyz(self.lat, self.lon)))
+        self.lat_order = np.argsort(self.lat, kind="stable")
+        self.lat_sorted = self.lat[self.lat_order]
+
+    def nearest(self, lat, lon, k=1):
+        xyz = np.column_stack(aero._xyz(np.ravel(lat), np.ravel(lon)))
+        chord, idx = self.tree.query(xyz, k=k)
+        dist = 2 * np.arcsin(np.minimum(chord / 2, 1)) * aero.r_earth
+        if np.ndim(lat) == 0:
+            return dist[0], idx[0]
+        return dist, idx
+
+    def within(self, lat, lon, radius):
+        xyz = np.column_stack(aero._xyz(lat, lon))[0]
+        chord = 2 * np.sin(min(radius / aero.r_earth, np.pi) / 2)
+        idx = np.array(self.tree.query_ball_point(xyz, chord), dtype=int)
+        dist = aero.distance(lat, lon, self.lat[idx], self.lon[idx])
+        order = np.argsort(dist, kind="stable")
+        return dist[order], idx[order]
+
+    def bbox(self, lat1, lon1, lat2, lon2):
+        i0 = np.searchsorted(self.lat_sorted, lat1, side="left")
+        i1 = np.searchsorted(self.lat_sorted, lat2, side="right")
+        idx = self.lat_order[i0:i1]
+        lon = self.lon[idx]
+        if lon1 <= lon2:
+            mask = (lon >= lon1) & (lon <= lon2)
+        else:
+            mask = (lon >= lon1) | (lon <= lon2)
+        return np.sort(idx[mask])
+
+
+def _spatial_index(name, types=None):
+    # with types, the index only covers the navaids of these types, and
+    # maps its indices back to the rows of the navaid table
+    def build():
+        df = {"airport": _get_airports, "fix": _get_fixes, "navaid": _get_navaids}[
+            name
+        ]()
+        if types is None:
+            return _SpatialIndex(df["lat"].values, df["lon"].values), None
+        rows = np.flatnonzero(df["type"].isin(types).values)
+        df = df.iloc[rows]
+        return _SpatialIndex(df["lat"].values, df["lon"].values), rows
+
+    index, rows = _cached((name, "spatial", types), build)
+
+    if rows is None:
+        return index
+    return _MappedIndex(index, rows)
+
+
+class _MappedIndex(object):
+    """Spatial index of a subset of a table, returning rows of the table."""
+
+    def __init__(self, index, rows):
+        self.index = index
+        self.rows = rows
+
+    def nearest(self, lat, lon, k=1):
+        dist, idx = self.index.nearest(lat, lon, k)
+        return dist, self.rows[idx]
+
+    def within(self, lat, lon, radius):
+        dist, idx = self.index.within(lat, lon, radius)
+        return dist, self.rows[idx]
+
+    def bbox(self, lat1, lon1, lat2, lon2):
+        return self.rows[self.index.bbox(lat1, lon1, lat2, lon2)]
+
+
 def airport(name):
     """Get the airport information.
 
     Args:
-        name (string): ICAO code of the airport.
+        name (string or list): ICAO code of the airport, or a list of codes.
 
     Returns:
         dict: Information ralted to the airport, including positon,
-            country, and region information.
+            country, and region information. None if not found.
+
+        For a list of codes, dict of ndarrays: One element per code, NaN
+            (or None) for codes not found.
 
     """
-    NAME = str(name).upper()
+    airports = _get_airports()
 
-    if not isinstance(airport, pd.DataFrame):
-        airports = _read_airport()
+    if np.ndim(name) == 0:
+        i = _airport_index().get_indexer([str(name).upper()])[0]
+        if i < 0:
+            return None
+        return airports.iloc[i, :].to_dict()
+
+    names = np.char.upper(np.asarray(name, dtype=str))
+    rows = _airport_index().get_indexer(names)
+    return _take_columns(airports, rows)
 
-    df = airports[airports["icao"] == NAME]
-    if df.shape[0] == 0:
-        return None
-    else:
-        return df.iloc[0, :].to_dict()
+
+def _take_columns(df, rows):
+    missing = rows < 0
+    rows = np.where(missing, 0, rows)
+    res = {}
+    for col in df.columns:
+        v = df[col].values[rows]
+        if missing.any():
+            v = np.where(missing, np.nan if v.dtype.kind in "iuf" else None, v)
+        res[col] = v
+    return res
 
 
 def closest_airport(lat, lon):
-    """Get the closest airport of a location.
+    """Get the closest airport of a location, or of many locations.
+
+    Airports are ranked by planar distance in degrees of latitude and
+    longitude, among the airports within 2 degrees of latitude and longitude.
+
+    Args:
+        lat (float or ndarray): Latitude.
+        lon (float or ndarray): Longitude.
+
+    Returns:
+        string or None (or ndarray): ICAO code of the airport, None when no
+            airport is within 2 degrees of latitude and longitude.
+
+    """
+    airports = _get_airports()
+    alat, alon = airports["lat"].values, airports["lon"].values
+    scalar = np.ndim(lat) == 0
+    lat, lon = np.ravel(lat).astype(float), np.ravel(lon).astype(float)
+
+    # candidates of the planar index, within the diagonal of the 2 degree box
+    tree = _cached("airport_planar", lambda: cKDTree(np.c_[alat, alon]))
+    k = min(16, len(alat))
+    _, idx = tree.query(
+        np.c_[lat, lon], k=k, distance_upper_bound=2 * np.sqrt(2) + 1e-9
+    )
+    idx = idx.reshape(len(lat), k)
+
+    valid = idx < len(alat)
+    cand = np.where(valid, idx, 0)
+    dlat = alat[cand] - lat[:, None]
+    dlon = alon[cand] - lon[:, None]
+    inbox = valid & (np.abs(dlat) <= 2) & (np.abs(dlon) <= 2)
+
+    # closest in the box, the first airport of the table on ties
+    dist2 = np.where(inbox, dlat**2 + dlon**2, np.inf)
+    best = inbox & (dist2 == dist2.min(axis=1, keepdims=True))
+    row = np.where(best, cand, len(alat)).min(axis=1)
+
+    icao = np.where(
+        inbox.any(axis=1), airports["icao"].values[np.minimum(row, len(alat) - 1)], None
+    )
+
+    # all candidates outside the box, more airports may be in the box corners
+    for i in np.flatnonzero(~inbox.any(axis=1) & valid[:, -1]):
+        mask = (
+            (alat >= lat[i] - 2)
+            & (alat <= lat[i] + 2)
+            & (alon >= lon[i] - 2)
+            & (alon <= lon[i] + 2)
+        )
+        rows = np.flatnonzero(mask)
+        if len(rows) > 0:
+            d2 = (alat[rows] - lat[i]) ** 2 + (alon[rows] - lon[i]) ** 2
+            icao[i] = airports["icao"].values[rows[np.argmin(d2)]]
+
+    if scalar:
+        return icao[0]
+    return icao
+
+
+def nearest_airports(lat, lon, k=5):
+    """Get the k nearest airports of a location, or of many locations.
+
+    Args:
+        lat (float or ndarray): Latitude.
+        lon (float or ndarray): Longitude.
+        k (int): Number of airports.
+
+    Returns:
+        (ndarray, ndarray): ICAO codes of the airports and distances (in
+            meters), sorted by increasing distance. Shape (k,) for a single
+            location, (n, k) for n locations, without the k axis when k is 1.
+
+    """
+    airports = _get_airports()
+
+    dist, idx = _spatial_index("airport").nearest(lat, lon, k)
+    return airports["icao"].values[idx], dist
+
+
+def assign_airports(
+    lat1, lon1, alt1, lat2, lon2, alt2, max_alt=3000, max_distance=20000
+):
+    """Assign departure and arrival airports to many flights at once.
+
+    The first and last low-altitude points of each flight are matched to
+    the closest airports with one batch query of the airport spatial index.
+
+    The confidence of an assignment, between 0 and 1, is the product of:
+        - the distance score, 1 - distance / max_distance,
+        - the height score, 1 - height above the airport / max_alt,
+        - the separation score, 1 - distance / distance to the second
+          closest airport.
+    Airports are not assigned (None, confidence 0) when the point is
+    farther than max_distance, or higher than max_alt above the airport.
+
+    Args:
+        lat1 (ndarray): Latitude of the first point of each flight.
+        lon1 (ndarray): Longitude of the first point of each flight.
+        alt1 (ndarray): Altitude of the first point of each flight (ft).
+        lat2 (ndarray): Latitude of the last point of each flight.
+        lon2 (ndarray): Longitude of the last point of each flight.
+        alt2 (ndarray): Altitude of the last point of each flight (ft).
+        max_alt (float): Maximum height above the airport (ft).
+        max_distance (float): Maximum distance to the airport (in meters).
+
+    Returns:
+        dict of ndarrays: origin and destination ICAO codes, their distances
+            (in meters) and their confidences.
+
+    """
+    airports = _get_airports()
+    icao = airports["icao"].values
+    elev = airports["alt"].values
+
+    res = {}
+    for key, lat, lon, alt in (
+        ("origin", lat1, lon1, alt1),
+        ("destination", lat2, lon2, alt2),
+    ):
+        lat, lon, alt = (
+            np.atleast_1d(np.asarray(x, dtype=float)) for x in (lat, lon, alt)
+        )
+        dist, idx = _spatial_index("airport").nearest(lat, lon, k=2)
+
+        d1, d2 = dist[:, 0], dist[:, 1]
+        height = np.maximum(alt - elev[idx[:, 0]], 0)
+
+        confidence = (
+            (1 - d1 / max_distance)
+            * (1 - height / max_alt)
+            * np.where(d2 > 0, 1 - d1 / np.where(d2 > 0, d2, 1), 0)
+        )
+        found = (d1 <= max_distance) & (height <= max_alt)
+
+        res[key] = np.where(found, icao[idx[:, 0]], None)
+        res[key + "_distance"] = d1
+        res[key + "_confidence"] = np.where(found, confidence, 0.0)
+
+    return res
+
+
+def airports_within(lat, lon, radius):
+    """Get the airports within a distance of a location.
 
     Args:
         lat (float): Latitude.
         lon (float): Longitude.
+        radius (float): Distance (in meters).
 
     Returns:
-        string or None: ICAO code of the airport
+        pd.DataFrame: Airports, with the distance column (in meters),
+            sorted by increasing distance.
 
     """
-    global airports
+    airports = _get_airports()
 
-    if not isinstance(airport, pd.DataFrame):
-        airports = _read_airport()
+    dist, idx = _spatial_index("airport").within(lat, lon, radius)
+    return airports.iloc[idx].assign(distance=dist)
 
-    df = airports[
-        airports["lat"].between(lat - 2, lat + 2)
-        & airports["lon"].between(lon - 2, lon + 2)
-    ]
 
-    if df.shape[0] == 0:
-        return None
+def airports_in_bbox(lat1, lon1, lat2, lon2):
+    """Get the airports within a bounding box.
+
+    Args:
+        lat1 (float): Southern latitude.
+        lon1 (float): Western longitude.
+        lat2 (float): Northern latitude.
+        lon2 (float): Eastern longitude, smaller than lon1 when the box
+            crosses the antimeridian.
 
-    coords = np.array(df[["lat", "lon"]])
-    dist2 = np.sum((coords - [lat, lon]) ** 2, axis=1)
-    idx = np.argmin(dist2)
+    Returns:
+        pd.DataFrame: Airports.
 
-    ap = df.iloc[idx, :]
+    """
+    airports = _get_airports()
 
-    return ap.icao
+    idx = _spatial_index("airport").bbox(lat1, lon1, lat2, lon2)
+    return airports.iloc[idx]
 
 
-def fix(name):
+def fix(name, lat=None, lon=None):
     """Get position of a fix or way point.
 
+    Fix names are not unique. By default the first fix with the name is
+    returned, or the closest one to a reference position when it is given.
+
     Args:
-        name (string): Name of the fix of way point.
+        name (string or list): Name of the fix of way point, or a list of names.
+        lat (float or ndarray): Latitude of the reference position.
+        lon (float or ndarray): Longitude of the reference position.
 
     Returns:
-        list: latitude and longitude
+        list: latitude, longitude, and name. None if not found.
+
+        For a list of names, dict of ndarrays: latitude, longitude and name
+            of the fixes, NaN (or None) for names not found.
 
     """
-    global fixes
+    fixes = _get_fixes()
 
-    if not isinstance(fixes, pd.DataFrame):
-        fixes = _read_fix()
+    scalar = np.ndim(name) == 0
+    names = np.char.upper(np.atleast_1d(np.asarray(name, dtype=str)))
+    rows = _lookup_rows(fixes, _fix_index(), names, lat, lon)
 
-    NAME = str(name).upper()
-    fix = fixes[fixes["fix"] == NAME].iloc[0].tolist()
-    return fix
+    if scalar:
+        return None if rows[0] < 0 else fixes.iloc[rows[0]].tolist()
+    return _take_columns(fixes, rows)
+
+
+def fix_candidates(name, lat=None, lon=None):
+    """Get all the fixes or way points with a name.
+
+    Args:
+        name (string): Name of the fix of way point.
+        lat (float): Latitude of a reference position.
+        lon (float): Longitude of a reference position.
+
+    Returns:
+        pd.DataFrame: Fixes with the name. With a reference position, the
+            distance column (in meters) is added, and fixes are sorted by
+            increasing distance.
+
+    """
+    return _candidates(_get_fixes(), _fix_index(), str(name).upper(), lat, lon)
 
 
 def closest_fix(lat, lon):
-    """Get the closest fix of a location.
+    """Get the closest fix of a location, or of many locations.
+
+    Args:
+        lat (float or ndarray): Latitude.
+        lon (float or ndarray): Longitude.
+
+    Returns:
+        list: latitude, longitude and name of the fix.
+        int: Distance to the fix (in meters).
+
+        For many locations, (pd.DataFrame, ndarray): Fixes, one row per
+            location, and distances (in meters).
+
+    """
+    fixes = _get_fixes()
+
+    dist, idx = _spatial_index("fix").nearest(lat, lon)
+
+    if np.ndim(lat) == 0:
+        return fixes.iloc[idx].tolist(), int(dist)
+    return fixes.iloc[idx].reset_index(drop=True), dist
+
+
+def nearest_fixes(lat, lon, k=5):
+    """Get the k nearest fixes of a location, or of many locations.
+
+    Args:
+        lat (float or ndarray): Latitude.
+        lon (float or ndarray): Longitude.
+        k (int): Number of fixes.
+
+    Returns:
+        (ndarray, ndarray): Names of the fixes and distances (in meters),
+            sorted by increasing distance. Shape (k,) for a single location,
+            (n, k) for n locations, without the k axis when k is 1.
+
+    """
+    fixes = _get_fixes()
+
+    dist, idx = _spatial_index("fix").nearest(lat, lon, k)
+    return fixes["fix"].values[idx], dist
+
+
+def fixes_within(lat, lon, radius):
+    """Get the fixes within a distance of a location.
 
     Args:
         lat (float): Latitude.
         lon (float): Longitude.
+        radius (float): Distance (in meters).
 
     Returns:
-        string: ICAO code of the airport.
-        int: Distance to the fix.
+        pd.DataFrame: Fixes, with the distance column (in meters),
+            sorted by increasing distance.
 
     """
-    global fixes
+    fixes = _get_fixes()
 
-    if not isinstance(fixes, pd.DataFrame):
-        fixes = _read_fix()
+    dist, idx = _spatial_index("fix").within(lat, lon, radius)
+    return fixes.iloc[idx].assign(distance=dist)
 
-    mask = (fixes["lat"].between(lat - 1, lat + 1)) & (
-        fixes["lon"].between(lon - 1, lon + 1)
-    )
-    chunk = fixes[mask]
 
-    lats = np.asarray(chunk["lat"])
-    lons = np.asarray(chunk["lon"])
+def fixes_in_bbox(lat1, lon1, lat2, lon2):
+    """Get the fixes within a bounding box.
+
+    Args:
+        lat1 (float): Southern latitude.
+        lon1 (float): Western longitude.
+        lat2 (float): Northern latitude.
+        lon2 (float): Eastern longitude, smaller than lon1 when the box
+            crosses the antimeridian.
+
+    Returns:
+        pd.DataFrame: Fixes.
+
+    """
+    fixes = _get_fixes()
+
+    idx = _spatial_index("fix").bbox(lat1, lon1, lat2, lon2)
+    return fixes.iloc[idx]
+
 
-    distances = aero.distance(lat, lon, lats, lons)
-    idx = distances.argmin()
+def navaid(ident, lat=None, lon=None):
+    """Get the information of a navaid (VOR, NDB, DME, ILS, etc.).
 
-    fix = chunk.iloc[idx].tolist()
-    dist = distances[idx]
+    Navaid identifiers are not unique. By default the first navaid with the
+    identifier is returned, or the closest one to a reference position when
+    it is given.
 
-    return fix, int(dist)
+    Args:
+        ident (string or list): Identifier of the navaid, or a list of them.
+        lat (float or ndarray): Latitude of the reference position.
+        lon (float or ndarray): Longitude of the reference position.
+
+    Returns:
+        dict: Type, identifier, position, elevation (ft), frequency (MHz),
+            range (nm), and the runway information for ILS components.
+            None if not found.
+
+        For a list of identifiers, dict of ndarrays: One element per
+            identifier, NaN (or None) for identifiers not found.
+
+    """
+    navaids = _get_navaids()
+
+    scalar = np.ndim(ident) == 0
+    names = np.char.upper(np.atleast_1d(np.asarray(ident, dtype=str)))
+    rows = _lookup_rows(navaids, _navaid_index(), names, lat, lon)
+
+    if scalar:
+        return None if rows[0] < 0 else navaids.iloc[rows[0]].to_dict()
+    return _take_columns(navaids, rows)
+
+
+def navaid_candidates(ident, lat=None, lon=None):
+    """Get all the navaids with an identifier.
+
+    Args:
+        ident (string): Identifier of the navaid.
+        lat (float): Latitude of a reference position.
+        lon (float): Longitude of a reference position.
+
+    Returns:
+        pd.DataFrame: Navaids with the identifier. With a reference position,
+            the distance column (in meters) is added, and navaids are sorted
+            by increasing distance.
+
+    """
+    return _candidates(_get_navaids(), _navaid_index(), str(ident).upper(), lat, lon)
+
+
+def _navaid_types(types):
+    if types is None:
+        return None
+    if isinstance(types, str):
+        types = [types]
+    return tuple(sorted(t.upper() for t in types))
+
+
+def closest_navaid(lat, lon, types=None):
+    """Get the closest navaid of a location, or of many locations.
+
+    Args:
+        lat (float or ndarray): Latitude.
+        lon (float or ndarray): Longitude.
+        types (string or list): Only consider these navaid types, for
+            example ["VOR", "DME"]. Defaults to all types.
+
+    Returns:
+        dict: Information of the navaid, see navaid().
+        int: Distance to the navaid (in meters).
+
+        For many locations, (pd.DataFrame, ndarray): Navaids, one row per
+            location, and distances (in meters).
+
+    """
+    navaids = _get_navaids()
+
+    index = _spatial_index("navaid", _navaid_types(types))
+    dist, idx = index.nearest(lat, lon)
+
+    if np.ndim(lat) == 0:
+        return navaids.iloc[idx].to_dict(), int(dist)
+    return navaids.iloc[idx].reset_index(drop=True), dist
+
+
+def nearest_navaids(lat, lon, k=5, types=None):
+    """Get the k nearest navaids of a location, or of many locations.
+
+    Args:
+        lat (float or ndarray): Latitude.
+        lon (float or ndarray): Longitude.
+        k (int): Number of navaids.
+        types (string or list): Only consider these navaid types.
+
+    Returns:
+        (ndarray, ndarray): Idents of the navaids and distances (in meters),
+            sorted by increasing distance. Shape (k,) for a single location,
+            (n, k) for n locations, without the k axis when k is 1.
+
+    """
+    navaids = _get_navaids()
+    index = _spatial_index("navaid", _navaid_types(types))
+    dist, idx = index.nearest(lat, lon, k)
+    return navaids["ident"].values[idx], dist
+
+
+def navaids_within(lat, lon, radius, types=None):
+    """Get the navaids within a distance of a location.
+
+    Args:
+        lat (float): Latitude.
+        lon (float): Longitude.
+        radius (float): Distance (in meters).
+        types (string or list): Only consider these navaid types.
+
+    Returns:
+        pd.DataFrame: Navaids, with the distance column (in meters),
+            sorted by increasing distance.
+
+    """
+    navaids = _get_navaids()
+    index = _spatial_index("navaid", _navaid_types(types))
+    dist, idx = index.within(lat, lon, radius)
+    return navaids.iloc[idx].assign(distance=dist)
+
+
+def great_circle_points(origins, destinations, step):
+    """Get points along the great circles between many pairs of airports.
+
+    Args:
+        origins (list): ICAO codes of the origin airports.
+        destinations (list): ICAO codes of the destination airports.
+        step (float): Distance between two points (in meters).
+
+    Returns:
+        (ndarray, ndarray, ndarray): Latitudes, longitudes of the points,
+            and offsets of the pairs. See aero.great_circle_points().
+
+    """
+    orig = airport(np.atleast_1d(origins))
+    dest = airport(np.atleast_1d(destinations))
+
+    for codes, ap in ((origins, orig), (destinations, dest)):
+        unknown = np.atleast_1d(codes)[ap["icao"] == None]  # noqa: E711
+        if len(unknown) > 0:
+            raise RuntimeError(f"Airports not found: {', '.join(unknown)}")
+
+    return aero.great_circle_points(
+        orig["lat"], orig["lon"], dest["lat"], dest["lon"], step
+    )
@@ -0,0 +1,425 @@
+"""Online statistics for building WRAP parameters from large datasets.
+
+The accumulators in this module take samples in batches and never hold all
+raw samples. Each of them can be merged with another one of the same kind,
+so partial results built by different workers (or from different days of
+data) are combined into the statistics of all samples.
+
+Examples:
+    Build the parameters of one variable over many flights::
+
+        from openap.extra import online
+
+        summary = online.Summary()
+        for flight in flights:
+            summary.update(flight_values(flight))
+
+        summary.record(["norm", "gamma", "beta"])
+
+    Partial summaries of several workers, each a dict of variable to Summary,
+    are merged and turned into WRAP records with::
+
+        summaries = online.merge(parts)
+        online.records(summaries, ["norm", "gamma", "beta"], workers=4)
+
+"""
+
+import numpy as np
+from openap.extra import statistics
+
+
+def _finite(x):
+    x = np.asarray(x, dtype=float).ravel()
+    return x[np.isfinite(x)]
+
+
+class Moments(object):
+    """Count, mean, variance, and range of the samples."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def var(self):
+        """Variance of the samples."""
+        return self.m2 / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        """Standard deviation of the samples."""
+        return np.sqrt(self.var)
+
+    def update(self, x):
+        """Add a batch of samples, non-finite values are ignored.
+
+        Args:
+            x (float or ndarray): Samples.
+
+        Returns:
+            Moments: self.
+
+        """
+        x = _finite(x)
+        if len(x) == 0:
+            return self
+
+        batch = Moments()
+        batch.count = len(x)
+        batch.mean = x.mean()
+        batch.m2 = np.sum((x - batch.mean) ** 2)
+        batch.min = x.min()
+        batch.max = x.max()
+        return self.merge(batch)
+
+    def merge(self, other):
+        """Merge the moments of other samples.
+
+        Args:
+            other (Moments): Moments of the other samples.
+
+        Returns:
+            Moments: self.
+
+        """
+        if other.count == 0:
+            return self
+
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta**2 * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+
+class QuantileSketch(object):
+    """Mergeable quantile sketch of the samples (KLL compactors).
+
+    Samples at level h of the sketch stand for 2**h original samples. A level
+    exceeding its capacity is sorted and every other sample is promoted to
+    the next level. The rank error is in the order of 1/k.
+    """
+
+    def __init__(self, k=200, seed=None):
+        """Initialize the sketch.
+
+        Args:
+            k (int): Capacity of the top level. Defaults to 200.
+            seed (int): Seed of the random compaction offsets.
+
+        """
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, x):
+        """Add a batch of samples, non-finite values are ignored.
+
+        Args:
+            x (float or ndarray): Samples.
+
+        Returns:
+            QuantileSketch: self.
+
+        """
+        x = _finite(x)
+        self.count += len(x)
+        self.levels[0] = np.concatenate([self.levels[0], x])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Merge the sketch of other samples.
+
+        Args:
+            other (QuantileSketch): Sketch of the other samples.
+
+        Returns:
+            QuantileSketch: self.
+
+        """
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate quantiles of the samples.
+
+        Args:
+            q (float or ndarray): Quantiles, between 0 and 1.
+
+        Returns:
+            float or ndarray: Values at the quantiles.
+
+        """
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)[()]
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [np.full(len(level), 2.0**h) for h, level in enumerate(self.levels)]
+        )
+        order = np.argsort(items, kind="stable")
+        cumweights = np.cumsum(weights[order])
+        idx = np.searchsorted(cumweights, np.asarray(q) * cumweights[-1])
+        return items[order][np.minimum(idx, len(items) - 1)]
+
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        while True:
+            full = [
+                h
+                for h, items in enumerate(self.levels)
+                if len(items) > self._capacity(h)
+            ]
+            if not full:
+                break
+
+            h = full[0]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            items = np.sort(self.levels[h])
+            n = len(items) // 2 * 2
+            self.levels[h] = items[n:]
+            self.levels[h + 1] = np.concatenate(
+                [self.levels[h + 1], items[self.rng.integers(2) : n : 2]]
+            )
+
+
+class Reservoir(object):
+    """Uniform random sample of fixed size from all samples.
+
+    Each sample gets a random key and the samples with the smallest keys are
+    kept, so that merged reservoirs remain uniform samples of all samples.
+    """
+
+    def __init__(self, size=10000, seed=None):
+        """Initialize the reservoir.
+
+        Args:
+            size (int): Number of samples kept. Defaults to 10000.
+            seed (int): Seed of the random keys.
+
+        """
+        self.size = size
+        self.count = 0
+        self.samples = np.empty(0)
+        self.keys = np.empty(0)
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, x):
+        """Add a batch of samples, non-finite values are ignored.
+
+        Args:
+            x (float or ndarray): Samples.
+
+        Returns:
+            Reservoir: self.
+
+        """
+        x = _finite(x)
+        self.count += len(x)
+        self._keep(
+            np.concatenate([self.samples, x]),
+            np.concatenate([self.keys, self.rng.random(len(x))]),
+        )
+        return self
+
+    def merge(self, other):
+        """Merge the reservoir of other samples.
+
+        Args:
+            other (Reservoir): Reservoir of the other samples.
+
+        Returns:
+            Reservoir: self.
+
+        """
+        self.count += other.count
+        self._keep(
+            np.concatenate([self.samples, other.samples]),
+            np.concatenate([self.keys, other.keys]),
+        )
+        return self
+
+    def _keep(self, samples, keys):
+        if len(keys) > self.size:
+            idx = np.argpartition(keys, self.size)[: self.size]
+            samples, keys = samples[idx], keys[idx]
+        self.samples, self.keys = samples, keys
+
+
+class Summary(object):
+    """Moments, quantile sketch, and reservoir sample of one variable."""
+
+    def __init__(self, k=200, size=10000, seed=None):
+        """Initialize the summary.
+
+        Args:
+            k (int): Capacity of the quantile sketch. Defaults to 200.
+            size (int): Size of the reservoir sample. Defaults to 10000.
+            seed (int): Random seed. Summaries merged across workers should
+                not share the same seed.
+
+        """
+        ss_sketch, ss_reservoir = np.random.SeedSequence(seed).spawn(2)
+        self.moments = Moments()
+        self.sketch = QuantileSketch(k, seed=ss_sketch)
+        self.reservoir = Reservoir(size, seed=ss_reservoir)
+
+    @property
+    def count(self):
+        """Number of finite samples."""
+        return self.moments.count
+
+    def update(self, x):
+        """Add a batch of samples, non-finite values are ignored.
+
+        Args:
+            x (float or ndarray): Samples.
+
+        Returns:
+            Summary: self.
+
+        """
+        x = _finite(x)
+        self.moments.update(x)
+        self.sketch.update(x)
+        self.reservoir.update(x)
+        return self
+
+    def merge(self, other):
+        """Merge the summary of other samples.
+
+        Args:
+            other (Summary): Summary of the other samples.
+
+        Returns:
+            Summary: self.
+
+        """
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        self.reservoir.merge(other.reservoir)
+        return self
+
+    def percentile(self, q):
+        """Approximate percentiles of the samples.
+
+        Args:
+            q (float or ndarray): Percentiles, between 0 and 100.
+
+        Returns:
+            float or ndarray: Values at the percentiles.
+
+        """
+        return self.sketch.quantile(np.asarray(q) / 100)
+
+    def fit(self, models, workers=None):
+        """Fit the reservoir sample with statistical models.
+
+        Args:
+            models (string or list): Name(s) of the models.
+            workers (int): Number of processes fitting the models.
+
+        Returns:
+            dict: Results of each model, see statistics.fit().
+
+        """
+        return statistics.fit(
+            self.reservoir.samples, models, workers=workers, pdf=False
+        )
+
+    def record(self, models, percentiles=(5, 95), fits=None):
+        """WRAP record of the variable.
+
+        Args:
+            models (string or list): Name(s) of the candidate models.
+            percentiles (tuple): Percentiles of the samples used as minimum
+                and maximum. Defaults to (5, 95).
+            fits (dict): Results of statistics.fit() on the reservoir, fitted
+                with the models if not given.
+
+        Returns:
+            dict: Mean as default value, minimum, maximum, and the model of
+                least error with its parameters, as returned by WRAP.
+
+        """
+        if fits is None:
+            fits = self.fit(models)
+
+        model = min(fits, key=lambda m: fits[m]["error"])
+        minimum, maximum = self.percentile(percentiles)
+
+        return {
+            "default": self.moments.mean,
+            "minimum": minimum,
+            "maximum": maximum,
+            "statmodel": model,
+            "statmodel_params": list(fits[model]["param"]),
+        }
+
+
+def merge(parts):
+    """Merge partial summaries of many variables.
+
+    Args:
+        parts (list): Dicts of variable to Summary, for example one from each
+            worker. Summaries are merged in place into the first summary of
+            each variable.
+
+    Returns:
+        dict: Summary of each variable over all parts.
+
+    """
+    merged = dict()
+    for part in parts:
+        for name, summary in part.items():
+            if name in merged:
+                merged[name].merge(summary)
+            else:
+                merged[name] = summary
+    return merged
+
+
+def records(summaries, models, percentiles=(5, 95), workers=None):
+    """WRAP records of many variables.
+
+    The reservoir samples of all variables are fitted in one call of
+    statistics.fit_many().
+
+    Args:
+        summaries (dict): Summary of each variable.
+        models (string or list): Name(s) of the candidate models.
+        percentiles (tuple): Percentiles used as minimum and maximum.
+        workers (int): Number of processes fitting the models.
+
+    Returns:
+        dict: WRAP record of each variable, see Summary.record().
+
+    """
+    fits = statistics.fit_many(
+        {name: s.reservoir.samples for name, s in summaries.items()},
+        models,
+        workers=workers,
+        pdf=False,
+    )
+    return {
+        name: s.record(models, percentiles, fits=fits[name])
+        for name, s in summaries.items()
+    }
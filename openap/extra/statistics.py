@@ -1,21 +1,133 @@
-"""Fit data using different statistical models."""
+"""Fit data using different statistical models.
 
+Fits are memoized on a hash of the data, fitting the same data and model
+again returns the previous parameters. The example PDF of each model can
+be skipped with pdf=False, and computed later with fitpdf().
+
+"""
+
+import hashlib
+from collections import OrderedDict
 import numpy as np
 import scipy.stats
-from matplotlib import pyplot as plt
 
-def fit(data, models):
+# memoized fits, keyed by the hash of the data and the model
+cache_size = 1024
+_memo = OrderedDict()
+
+
+def fitpdf(model, param, dscale):
+    """Example PDF of a fitted model, for ploting.
+
+    Args:
+        model (string): Name of the model.
+        param (tuple): Fitted parameters of the model.
+        dscale (float): Range of the data, the PDF extends 5% of it beyond
+            the 99.9% interval of the model.
+
+    Returns:
+        (ndarray, ndarray): x and PDF, 1000 points.
+
+    """
+    dist = getattr(scipy.stats, model)
+    ci = dist.interval(0.999, *param)
+    xmin = ci[0] - dscale*0.05
+    xmax = ci[1] + dscale*0.05
+    pdfx = np.linspace(xmin, xmax, 1000)
+    pdfy = dist.pdf(pdfx, *param)
+    return pdfx, pdfy
+
+
+def fit(data, models, workers=None, pdf=True):
+    """Fit data with statistical models of scipy.stats.
+
+    Args:
+        data (list or ndarray): Data samples.
+        models (string or list): Name(s) of the models, for example 'norm',
+            'gamma', or 'beta'.
+        workers (int): Number of processes fitting the models. Defaults to
+            None, in the current process.
+        pdf (bool): Compute the example PDF of each model. Defaults to True.
+
+    Returns:
+        dict: Results of each model, with the parameters fitted on all data
+            ('param'), the Kolmogorov-Smirnov statistic of the test data
+            ('error'), the range of the data ('dscale'), and with pdf, the
+            example PDF ('pdfx', 'pdfy').
+
+    """
+    return fit_many({None: data}, models, workers=workers, pdf=pdf)[None]
+
+
+def fit_many(datasets, models, workers=None, pdf=True):
+    """Fit many variables with statistical models of scipy.stats.
+
+    All pairs of variable and model are fitted in one pool of processes.
+
+    Args:
+        datasets (dict): Data samples of each variable.
+        models (string or list): Name(s) of the models, for all variables.
+        workers (int): Number of processes fitting the models. Defaults to
+            None, in the current process.
+        pdf (bool): Compute the example PDF of each model. Defaults to True.
+
+    Returns:
+        dict: Results of each variable, as returned by fit().
+
+    """
     if not isinstance(models, list):
         if isinstance(models, str):
             models = [models]
         else:
             raise RuntimeError('models must be string or list of strings.')
 
-    data = np.array(data)
+    cleaned = {name: _clean(data) for name, data in datasets.items()}
+    hashes = {name: hashlib.sha1(data.tobytes()).hexdigest() for name, data in cleaned.items()}
+
+    tasks = OrderedDict()
+    for name, data in cleaned.items():
+        for model in models:
+            key = (hashes[name], model)
+            if key not in _memo and key not in tasks:
+                tasks[key] = (data, model)
+
+    if workers and workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fitted = list(executor.map(_fit_model, *zip(*tasks.values())))
+    else:
+        fitted = [_fit_model(data, model) for data, model in tasks.values()]
+
+    for key, f in zip(tasks, fitted):
+        _memo[key] = f
+        while len(_memo) > cache_size:
+            _memo.popitem(last=False)
+
+    results = dict()
+    for name, data in cleaned.items():
+        dscale = (max(data) + 1e-8) - (min(data) - 1e-8)
+        results[name] = dict()
+        for model in models:
+            param, error = _memo[(hashes[name], model)]
+            results[name][model] = {'param': param, 'error': error, 'dscale': dscale}
+            if pdf:
+                pdfx, pdfy = fitpdf(model, param, dscale)
+                results[name][model]['pdfx'] = pdfx
+                results[name][model]['pdfy'] = pdfy
+
+    return results
+
+
+def _clean(data):
+    data = np.array(data, dtype=float)
     data = data[np.isfinite(data)]
     data = data[data>np.percentile(data, 0.025)]
     data = data[data<np.percentile(data, 99.975)]
+    return data
+
 
+def _fit_model(data, model):
     # split data in training and testing 50-50
     train, test = data[0:-1:1], data[1:-1:1]
 
@@ -24,47 +136,32 @@ def fit(data, models):
     dmax = max(data) + 1e-8
     dscale = dmax - dmin
 
-    result = dict()
-    for model in models:
-
-        # fit distribution and run kstest
-        dist = getattr(scipy.stats, model)
-        if model == 'norm':
-            param_train = dist.fit(train)
-        elif model == 'gamma':
-            param_train = dist.fit(train, floc=dmin)
-        else:
-            param_train = dist.fit(train, floc=dmin, fscale=dscale)
-
-        ks = scipy.stats.kstest(test, model, param_train)
-        error = ks[0]   # D-stats
-
-        # recompute distribution based on all data
-        if model == 'norm':
-            param = dist.fit(data)
-        elif model=='gamma':
-            param = dist.fit(data, floc=dmin)
-        else:
-            param = dist.fit(data, floc=dmin, fscale=dscale)
+    # fit distribution and run kstest
+    dist = getattr(scipy.stats, model)
+    if model == 'norm':
+        param_train = dist.fit(train)
+    elif model == 'gamma':
+        param_train = dist.fit(train, floc=dmin)
+    else:
+        param_train = dist.fit(train, floc=dmin, fscale=dscale)
 
-        # construct the example PDF for ploting
-        ci = dist.interval(0.999, *param)
-        xmin = ci[0] - dscale*0.05
-        xmax = ci[1] + dscale*0.05
-        pdfx = np.linspace(xmin, xmax, 1000)
-        pdfy = dist.pdf(pdfx, *param)
+    ks = scipy.stats.kstest(test, model, param_train)
+    error = ks[0]   # D-stats
 
-        result[model] = dict()
-        result[model]['param'] = param
-        result[model]['pdfx'] = pdfx
-        result[model]['pdfy'] = pdfy
-        result[model]['error'] = error
+    # recompute distribution based on all data
+    if model == 'norm':
+        param = dist.fit(data)
+    elif model=='gamma':
+        param = dist.fit(data, floc=dmin)
+    else:
+        param = dist.fit(data, floc=dmin, fscale=dscale)
 
-        # print(model, param, error)
+    return param, error
 
-    return result
 
 def fitplot(data, model, **kwargs):
+    from matplotlib import pyplot as plt
+
     fitresults = fit(data, model)
 
     if 'bins' in kwargs:
@@ -75,7 +172,7 @@ def fitplot(data, model, **kwargs):
 
     data = np.array(data)
     data = data[np.isfinite(data)]
-    plt.hist(data, bins=bins, normed=True, color='gray', edgecolor='none', alpha=0.3)
+    plt.hist(data, bins=bins, density=True, color='gray', edgecolor='none', alpha=0.3)
     plt.plot(fitresults[model]['pdfx'], fitresults[model]['pdfy'], label=model, **kwargs)
     # plt.legend(loc='best')
     plt.xlim([min(data), max(data)])
@@ -19,11 +19,18 @@ Examples:
             'statmodel_params': [17.82, 5.05, 0.62, 0.2]
         }
 
+    The file of each aircraft type is parsed once, and shared by all WRAP
+    objects of the same type.
+
 """
 
 import os
 import glob
+import threading
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
+import scipy.stats
 
 curr_path = os.path.dirname(os.path.realpath(__file__))
 dir_wrap = curr_path + "/data/wrap/"
@@ -31,6 +38,71 @@ file_synonym = curr_path + "/data/wrap/_synonym.csv"
 
 wrap_synonym = pd.read_csv(file_synonym)
 
+_lock = threading.RLock()
+_cache = {}
+_dists = {}
+
+
+def _read_wrap(ac):
+    df = pd.read_fwf(dir_wrap + ac + ".txt")
+
+    records = {}
+    for v in df.values:
+        params = np.array([float(i) for i in v[7].split("|")])
+        params.flags.writeable = False
+
+        records[v[0]] = MappingProxyType(
+            {
+                "default": float(v[3]),
+                "minimum": float(v[4]),
+                "maximum": float(v[5]),
+                "statmodel": v[6],
+                "statmodel_params": params,
+            }
+        )
+    return df, MappingProxyType(records)
+
+
+def _get_wrap(ac):
+    # load-once cache of the parsed files, safe to share between threads
+    value = _cache.get(ac)
+    if value is None:
+        with _lock:
+            value = _cache.get(ac)
+            if value is None:
+                value = _cache[ac] = _read_wrap(ac)
+    return value
+
+
+def _frozen(record):
+    # frozen distribution, with its cdf at the minimum and the maximum,
+    # None when the model is degenerate (scale <= 0) or the cdf not finite
+    params = record["statmodel_params"]
+    if not params[-1] > 0:
+        return None
+
+    dist = getattr(scipy.stats, record["statmodel"])(*params)
+    with np.errstate(all="ignore"):
+        cdf_min, cdf_max = dist.cdf([record["minimum"], record["maximum"]])
+
+    if not (np.isfinite(cdf_min) and np.isfinite(cdf_max) and cdf_max > cdf_min):
+        return None
+    return dist, cdf_min, cdf_max
+
+
+def _get_dists(ac):
+    # frozen distributions, built on the first sampling of the aircraft type
+    value = _dists.get(ac)
+    if value is None:
+        with _lock:
+            value = _dists.get(ac)
+            if value is None:
+                records = _get_wrap(ac)[1]
+                value = _dists[ac] = MappingProxyType(
+                    {var: _frozen(r) for var, r in records.items()}
+                )
+    return value
+
 
 class WRAP(object):
     """Construct the kinematic model of the aicraft."""
@@ -63,25 +135,83 @@ class WRAP(object):
                     f"Kinematic model for {self.ac} not avaiable in OpenAP."
                 )
 
-        self.df = pd.read_fwf(dir_wrap + self.ac + ".txt")
+        self.df, self._records = _get_wrap(self.ac)
+
+    def __getstate__(self):
+        # the parsed file is shared, fetched again from the cache on unpickling
+        state = self.__dict__.copy()
+        del state["df"], state["_records"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.df, self._records = _get_wrap(self.ac)
 
     def _get_var(self, var):
-        r = self.df[self.df["variable"] == var]
+        r = self._records.get(var)
 
-        if r.shape[0] == 0:
+        if r is None:
             raise RuntimeError("variable not found")
 
-        v = r.values[0]
-
-        res = {
-            "default": v[3],
-            "minimum": v[4],
-            "maximum": v[5],
-            "statmodel": v[6],
-            "statmodel_params": [float(i) for i in v[7].split("|")],
-        }
+        res = dict(r)
+        res["statmodel_params"] = r["statmodel_params"].tolist()
         return res
 
+    def sample(self, variables=None, n=1, rng=None):
+        """Draw random samples of variables from their statistical models.
+
+        Each variable is drawn independently from its model, truncated to
+        its minimum and maximum. Draws outside the range are rejected when
+        the model has most of its mass in the range, otherwise the samples
+        are drawn by inverse transform. Variables with a degenerate model
+        (for example a scale of 0) are drawn uniformly between their minimum
+        and maximum.
+
+        Args:
+            variables (list): Names of the variables, for example
+                ['cl_v_cas_const', 'cr_h_mean']. Defaults to all variables.
+            n (int): Number of samples. Defaults to 1.
+            rng (int or numpy.random.Generator): Seed or random generator.
+
+        Returns:
+            pandas.DataFrame: n samples, with one column per variable.
+
+        """
+        if variables is None:
+            variables = list(self._records)
+        elif isinstance(variables, str):
+            variables = [variables]
+
+        rng = np.random.default_rng(rng)
+        dists = _get_dists(self.ac)
+
+        columns = {}
+        for var in variables:
+            if var not in dists:
+                raise RuntimeError(f"variable {var} not found")
+
+            vmin, vmax = self._records[var]["minimum"], self._records[var]["maximum"]
+
+            if dists[var] is None:
+                columns[var] = rng.uniform(vmin, vmax, n)
+                continue
+
+            dist, cdf_min, cdf_max = dists[var]
+
+            if cdf_max - cdf_min > 0.5:
+                x = np.empty(0)
+                while len(x) < n:
+                    m = int((n - len(x)) / (cdf_max - cdf_min) * 1.05) + 10
+                    r = dist.rvs(size=m, random_state=rng)
+                    x = np.concatenate([x, r[(r >= vmin) & (r <= vmax)]])
+                x = x[:n]
+            else:
+                x = dist.ppf(rng.uniform(cdf_min, cdf_max, n))
+
+            columns[var] = np.clip(x, vmin, vmax)
+
+        return pd.DataFrame(columns, columns=variables)
+
     def takeoff_speed(self):
         """Get takeoff speed."""
         return self._get_var("to_v_lof")
@@ -0,0 +1,519 @@
+"""Columnar container for many flight trajectories.
+
+All flights are stored back to back in flat NumPy columns. The flight
+boundaries are given by an offsets array of length n_flights + 1, flight i
+covers the samples offsets[i]:offsets[i+1].
+
+Examples::
+
+    from openap import Trajectories
+
+    trajs = Trajectories(ts, lat=lat, lon=lon, alt=alt, spd=spd, roc=roc,
+                         offsets=offsets)
+
+    trajs.distance()     # along-track distance since the start of each flight
+    trajs.track()        # track angle
+    trajs.path_angle()   # flight path angle, as used in FuelFlow.enroute()
+
+Raw surveillance data of many aircraft can be split into flights with::
+
+    order, offsets = split_flights(icao24, ts, alt=alt, spd=spd, roc=roc)
+    trajs = Trajectories(ts[order], alt=alt[order], spd=spd[order],
+                         offsets=offsets)
+
+and sorted, resampled and filtered in one call with::
+
+    trajs = preprocess(ts[order], alt=alt[order], spd=spd[order],
+                       roc=roc[order], offsets=offsets, dt=1,
+                       filters={"alt": SavitzkyGolay(), "roc": TWF()})
+
+    FlightPhase().label_many(trajs.ts, trajs.alt, trajs.spd, trajs.roc,
+                             trajs.offsets)
+
+"""
+
+import numpy as np
+from openap.extra import aero, nav
+from openap.phase import FlightPhase
+
+columns = ("ts", "lat", "lon", "alt", "spd", "roc")
+
+
+class Trajectories(object):
+    """Ragged container of many flights with vectorized derived kinematics."""
+
+    def __init__(
+        self, ts, lat=None, lon=None, alt=None, spd=None, roc=None, offsets=None
+    ):
+        """Initialize the container.
+
+        Args:
+            ts (ndarray): Time (unit: second).
+            lat (ndarray): Latitude (unit: degree).
+            lon (ndarray): Longitude (unit: degree).
+            alt (ndarray): Altitude (unit: ft).
+            spd (ndarray): Ground speed or true airspeed (unit: kt).
+            roc (ndarray): Rate of climb (unit: ft/min). Negative for descent.
+            offsets (ndarray): Start index of each flight, followed by the total
+                number of samples. Defaults to a single flight.
+
+        """
+        super(Trajectories, self).__init__()
+
+        self.ts = np.asarray(ts, dtype=float)
+        n = len(self.ts)
+
+        for name, col in zip(columns[1:], (lat, lon, alt, spd, roc)):
+            if col is not None:
+                col = np.asarray(col, dtype=float)
+                if len(col) != n:
+                    raise RuntimeError("Input columns must have same length.")
+            setattr(self, name, col)
+
+        if offsets is None:
+            offsets = [0, n]
+
+        self.offsets = np.asarray(offsets, dtype=int)
+
+        if (
+            self.offsets[0] != 0
+            or self.offsets[-1] != n
+            or np.any(np.diff(self.offsets) < 0)
+        ):
+            raise RuntimeError("offsets must increase from 0 to the number of samples.")
+
+    @classmethod
+    def from_flights(cls, flights):
+        """Build the container from a list of flights.
+
+        Args:
+            flights (list): Flights as dicts (or DataFrames) of columns, with
+                at least the "ts" column.
+
+        Returns:
+            Trajectories: The flights stored back to back.
+
+        """
+        lengths = [len(f["ts"]) for f in flights]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(int)
+
+        data = {}
+        for name in columns:
+            if all(name in f for f in flights):
+                data[name] = np.concatenate([np.asarray(f[name]) for f in flights])
+
+        return cls(offsets=offsets, **data)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nsamples(self):
+        """Total number of samples."""
+        return len(self.ts)
+
+    @property
+    def lengths(self):
+        """Number of samples of each flight."""
+        return np.diff(self.offsets)
+
+    @property
+    def starts(self):
+        """Index of the first sample of each non-empty flight."""
+        return self.offsets[:-1][self.lengths > 0]
+
+    def flight_index(self):
+        """Get the flight number of each sample."""
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def flight(self, i):
+        """Get the columns of one flight.
+
+        Args:
+            i (int): Flight number.
+
+        Returns:
+            dict: Columns of the flight (views on the container data).
+
+        """
+        s = slice(self.offsets[i], self.offsets[i + 1])
+        return {
+            name: getattr(self, name)[s]
+            for name in columns
+            if getattr(self, name) is not None
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.flight(i)
+
+    def _require(self, *names):
+        for name in names:
+            if getattr(self, name) is None:
+                raise RuntimeError(f"Column {name} is required.")
+
+    def _diff(self, x):
+        # backward difference, reset to zero at the start of each flight
+        d = np.zeros(len(x))
+        d[1:] = np.diff(x)
+        d[self.starts] = 0
+        return d
+
+    def _backfill_start(self, x):
+        # first sample of each flight takes the value of the second sample
+        starts = self.offsets[:-1][self.lengths > 1]
+        x[starts] = x[starts + 1]
+        return x
+
+    def dt(self):
+        """Get the time step from the previous sample, 0 for the first sample.
+
+        Returns:
+            ndarray: Time step (unit: second).
+
+        """
+        return self._diff(self.ts)
+
+    def step_distance(self):
+        """Get the distance from the previous sample, 0 for the first sample.
+
+        Returns:
+            ndarray: Distance (unit: m).
+
+        """
+        self._require("lat", "lon")
+        d = np.zeros(self.nsamples)
+        d[1:] = aero.distance(self.lat[:-1], self.lon[:-1], self.lat[1:], self.lon[1:])
+        d[self.starts] = 0
+        return d
+
+    def distance(self):
+        """Get the cumulative along-track distance since the start of each flight.
+
+        Returns:
+            ndarray: Distance (unit: m).
+
+        """
+        d = np.cumsum(self.step_distance())
+        lengths = self.lengths
+        d -= np.repeat(d[self.starts], lengths[lengths > 0])
+        return d
+
+    def track(self):
+        """Get the track angle, from the previous sample to the current sample.
+
+        The first sample of a flight takes the track of the second sample.
+
+        Returns:
+            ndarray: Track angle (unit: degree). Between 0 and 360.
+
+        """
+        self._require("lat", "lon")
+        trk = np.full(self.nsamples, np.nan)
+        trk[1:] = aero.bearing(self.lat[:-1], self.lon[:-1], self.lat[1:], self.lon[1:])
+        trk[self.starts] = np.nan
+        return self._backfill_start(trk)
+
+    def path_angle(self):
+        """Get the flight path angle, from the speed and the rate of climb.
+
+        Returns:
+            ndarray: Flight path angle (unit: degree).
+
+        """
+        self._require("spd", "roc")
+        return np.degrees(np.arctan2(self.roc * aero.fpm, self.spd * aero.kts))
+
+    def acceleration(self):
+        """Get the acceleration from the previous sample.
+
+        The first sample of a flight takes the acceleration of the second sample.
+        Samples with no time step are NaN.
+
+        Returns:
+            ndarray: Acceleration (unit: m/s^2).
+
+        """
+        self._require("spd")
+        dt = self.dt()
+        dv = self._diff(self.spd) * aero.kts
+        acc = np.full(self.nsamples, np.nan)
+        np.divide(dv, dt, out=acc, where=dt > 0)
+        acc[self.starts] = np.nan
+        return self._backfill_start(acc)
+
+
+def split_flights(
+    icao24,
+    ts,
+    alt=None,
+    spd=None,
+    roc=None,
+    lat=None,
+    lon=None,
+    gap=600,
+    min_ground=60,
+    airport_radius=None,
+    min_samples=2,
+    gnd_alt=100,
+    gnd_spd=60,
+):
+    """Split raw positions of many aircraft into individual flights.
+
+    Positions are sorted by aircraft and time, then split where:
+        - the aircraft changes,
+        - the time gap between two positions is larger than gap,
+        - the aircraft lands and takes off again. With alt, spd, and roc, a
+          position is on ground when FlightPhase labels it as ground (GND),
+          with the same fuzzy rule on altitude, rate of climb, and speed.
+          Otherwise, it is on ground when its altitude is below gnd_alt and
+          its speed, if given, below gnd_spd. A ground period of at least
+          min_ground seconds, preceded and followed by airborne data, is
+          split at its middle.
+
+    With airport_radius, lat and lon, a position only counts as on ground
+    when it is also within airport_radius of an airport.
+
+    Args:
+        icao24 (ndarray): Aircraft identifier of each position.
+        ts (ndarray): Timestamp (unit: second).
+        alt (ndarray): Altitude (unit: ft). Ground states are ignored if None.
+        spd (ndarray): Speed (unit: kt).
+        roc (ndarray): Rate of climb (unit: ft/min).
+        lat (ndarray): Latitude (unit: degree).
+        lon (ndarray): Longitude (unit: degree).
+        gap (float): Maximum time gap within a flight (unit: second).
+        min_ground (float): Minimum time on ground between two flights
+            (unit: second).
+        airport_radius (float): Maximum distance of ground positions to the
+            closest airport (unit: m).
+        min_samples (int): Flights with fewer positions are dropped.
+        gnd_alt (float): Altitude below which a position can be on ground,
+            without spd or roc (unit: ft). Defaults to 100.
+        gnd_spd (float): Speed below which a position can be on ground,
+            without roc (unit: kt). Defaults to 60.
+
+    Returns:
+        (ndarray, ndarray): Indices of the positions sorted by flight, and the
+            offsets of the flights in the sorted positions.
+
+    """
+    ts = np.asarray(ts, dtype=float)
+    n = len(ts)
+    idx = np.arange(n)
+
+    codes = np.unique(np.asarray(icao24), return_inverse=True)[1].ravel()
+    order = np.lexsort((ts, codes))
+    codes, ts = codes[order], ts[order]
+
+    brk = np.ones(n, dtype=bool)
+    brk[1:] = (np.diff(codes) != 0) | (np.diff(ts) > gap)
+
+    if alt is not None and n > 0:
+        alt = np.asarray(alt, dtype=float)[order]
+        if spd is not None and roc is not None:
+            spd = np.asarray(spd, dtype=float)[order]
+            roc = np.asarray(roc, dtype=float)[order]
+            gnd = FlightPhase()._fuzzy_states(alt, spd, roc) == 1
+        else:
+            gnd = alt < gnd_alt
+            if spd is not None:
+                gnd &= np.asarray(spd, dtype=float)[order] < gnd_spd
+        if airport_radius is not None and lat is not None and lon is not None:
+            i = np.flatnonzero(gnd)
+            gnd[i] = (
+                _airport_distance(np.asarray(lat)[order][i], np.asarray(lon)[order][i])
+                <= airport_radius
+            )
+
+        # ground runs, and start of the gap-free segment of each position
+        change = brk.copy()
+        change[1:] |= gnd[1:] != gnd[:-1]
+        run_start = np.maximum.accumulate(np.where(change, idx, 0))
+        seg_start = np.maximum.accumulate(np.where(brk, idx, 0))
+
+        # takeoff after a long enough ground run preceded by airborne data
+        i = np.flatnonzero(~brk[1:] & gnd[:-1] & ~gnd[1:]) + 1
+        i0 = run_start[i - 1]
+        mask = (i0 > seg_start[i - 1]) & (ts[i - 1] - ts[i0] >= min_ground)
+        i, i0 = i[mask], i0[mask]
+
+        # split in the middle of the ground run, with a monotonic sort key
+        span, t0 = np.ptp(ts) + 1, ts.min()
+        key = codes * span + (ts - t0)
+        mid = codes[i] * span + ((ts[i0] + ts[i - 1]) / 2 - t0)
+        brk[np.searchsorted(key, mid)] = True
+
+    starts = np.flatnonzero(brk)
+    lengths = np.diff(np.append(starts, n))
+    keep = lengths >= min_samples
+
+    order = order[np.repeat(keep, lengths)]
+    offsets = np.concatenate([[0], np.cumsum(lengths[keep])]).astype(int)
+
+    return order, offsets
+
+
+def _airport_distance(lat, lon):
+    codes, dist = nav.nearest_airports(lat, lon, k=1)
+    return dist
+
+
+def preprocess(
+    ts,
+    lat=None,
+    lon=None,
+    alt=None,
+    spd=None,
+    roc=None,
+    offsets=None,
+    dt=1,
+    filters=None,
+):
+    """Sort, resample, and filter the channels of one or many flights.
+
+    Samples are sorted by time within each flight once. All channels are
+    then linearly interpolated on a uniform time grid starting at the
+    first sample of each flight, sharing the same interpolation index.
+    Missing values (NaN) are interpolated from the neighbouring samples of
+    the same flight. Longitudes are interpolated and filtered across the
+    antimeridian, and wrapped to [-180, 180) at the end.
+
+    Filters are objects of openap.extra.filters, given for each channel.
+    SavitzkyGolay filters all flights at once, other filters are applied
+    to each flight of at least 4 samples.
+
+    Args:
+        ts (ndarray): Time (unit: second).
+        lat (ndarray): Latitude (unit: degree).
+        lon (ndarray): Longitude (unit: degree).
+        alt (ndarray): Altitude (unit: ft).
+        spd (ndarray): Ground speed or true airspeed (unit: kt).
+        roc (ndarray): Rate of climb (unit: ft/min). Negative for descent.
+        offsets (ndarray): Start index of each flight, followed by the total
+            number of samples. Defaults to a single flight.
+        dt (float): Time step of the output (unit: second). Defaults to 1.
+        filters (dict): Filter of each channel, for example
+            {"alt": SavitzkyGolay(), "spd": TWF()}. Defaults to no filter.
+
+    Returns:
+        Trajectories: Resampled and filtered flights.
+
+    """
+    data = Trajectories(
+        ts, lat=lat, lon=lon, alt=alt, spd=spd, roc=roc, offsets=offsets
+    )
+
+    nflight = len(data)
+    lengths = data.lengths
+    lo, hi = data.offsets[:-1], data.offsets[1:]
+    nonempty = lengths > 0
+
+    # sort once by flight and time
+    flight = data.flight_index()
+    order = np.lexsort((data.ts, flight))
+    ts = data.ts[order]
+
+    # uniform time grid of each flight
+    t0 = np.zeros(nflight)
+    t1 = np.zeros(nflight)
+    t0[nonempty] = ts[lo[nonempty]]
+    t1[nonempty] = ts[hi[nonempty] - 1]
+
+    counts = np.where(nonempty, np.floor((t1 - t0) / dt).astype(int) + 1, 0)
+    goffsets = np.concatenate([[0], np.cumsum(counts)]).astype(int)
+    gflight = np.repeat(np.arange(nflight), counts)
+    gts = t0[gflight] + (np.arange(goffsets[-1]) - goffsets[gflight]) * dt
+
+    # monotonic keys across flights, for a single search of all flights
+    span = np.max(t1 - t0, initial=0) + 2 * dt
+    key = flight * span + (ts - t0[flight])
+    gkey = gflight * span + (gts - t0[gflight])
+
+    columns = {"ts": gts}
+    shared = None
+
+    for name in ("lat", "lon", "alt", "spd", "roc"):
+        y = getattr(data, name)
+        if y is None:
+            continue
+
+        y = y[order]
+        valid = np.isfinite(y)
+
+        if name == "lon":
+            # unwrapped from the first longitude of each flight
+            y = y.copy()
+            u = np.unwrap(y[valid], period=360)
+            f, first, n = np.unique(
+                flight[valid], return_index=True, return_counts=True
+            )
+            y[valid] = u - np.repeat(u[first] - y[valid][first], n)
+
+        if valid.all():
+            if shared is None:
+                shared = _interp_index(key, flight, gkey, gflight, nflight)
+            index = shared
+        else:
+            index = _interp_index(key[valid], flight[valid], gkey, gflight, nflight)
+
+        columns[name] = _interp(y[valid], *index)
+
+    for name, filt in (filters or {}).items():
+        if name not in columns or name == "ts":
+            raise RuntimeError(f"Column {name} is not available for filtering.")
+
+        if getattr(filt, "interpolate", False):
+            raise RuntimeError(
+                "Filters must not interpolate, data is already resampled."
+            )
+
+        y = columns[name]
+
+        if hasattr(filt, "filter_many"):
+            columns[name] = filt.filter_many(y, goffsets, X=gts)
+            continue
+
+        y = y.copy()
+        for s, e in zip(goffsets[:-1], goffsets[1:]):
+            if e - s >= 4:
+                y[s:e] = filt.filter(gts[s:e], y[s:e])[1]
+        columns[name] = y
+
+    # longitudes stay unwrapped through interpolation and filters
+    if "lon" in columns:
+        columns["lon"] = (columns["lon"] + 180) % 360 - 180
+
+    return Trajectories(offsets=goffsets, **columns)
+
+
+def _interp_index(key, flight, gkey, gflight, nflight):
+    # samples around each grid point, within the same flight
+    counts = np.bincount(flight, minlength=nflight)
+    first = np.concatenate([[0], np.cumsum(counts)])[:-1]
+    last = first + counts - 1
+
+    j = np.searchsorted(key, gkey, side="right")
+    a, b = first[gflight], last[gflight]
+    empty = counts[gflight] == 0
+
+    j0 = np.where(empty, 0, np.clip(j - 1, a, b))
+    j1 = np.where(empty, 0, np.clip(j, a, b))
+
+    if len(key) == 0:
+        return j0, j1, np.zeros(len(gkey)), empty
+
+    dx = key[j1] - key[j0]
+    frac = np.zeros(len(gkey))
+    np.divide(gkey - key[j0], dx, out=frac, where=dx > 0)
+    np.clip(frac, 0, 1, out=frac)
+
+    return j0, j1, frac, empty
+
+
+def _interp(y, j0, j1, frac, empty):
+    if len(y) == 0:
+        return np.full(len(j0), np.nan)
+    out = y[j0] + frac * (y[j1] - y[j0])
+    out[empty] = np.nan
+    return out
@@ -67,7 +67,6 @@ setup(
     install_requires=[
         "numpy",
         "scipy",
-        "scikit-fuzzy",
         "pandas",
         "pyyaml",
         "matplotlib",
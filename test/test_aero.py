@@ -0,0 +1,63 @@
+import numpy as np
+from openap import aero
+
+h = np.linspace(-1000, 25000, 10001)
+v = np.linspace(0, 300, 10001)
+
+
+def test_lookup():
+    p, rho, T = aero.atmos(h)
+    a = aero.vsound(h)
+    v_cas = aero.tas2cas(v, h)
+    v_tas = aero.cas2tas(v, h)
+
+    aero.set_lookup("linear")
+    try:
+        p1, rho1, T1 = aero.atmos(h)
+        assert np.allclose(p1, p, rtol=5e-7, atol=0)
+        assert np.allclose(rho1, rho, rtol=5e-7, atol=0)
+        assert np.array_equal(T1, T)
+        assert np.allclose(aero.vsound(h), a, rtol=1e-15, atol=0)
+        assert np.allclose(aero.tas2cas(v, h), v_cas, rtol=0, atol=1e-4)
+        assert np.allclose(aero.cas2tas(v, h), v_tas, rtol=0, atol=1e-4)
+
+        # outside of the table, analytic formulas are used
+        assert aero.atmos(30000) == aero._atmos_isa(30000)
+    finally:
+        aero.set_lookup(None)
+
+
+def test_distance_matrix():
+    lat1, lon1 = np.random.uniform(-80, 80, 200), np.random.uniform(-180, 180, 200)
+    lat2, lon2 = np.random.uniform(-80, 80, 300), np.random.uniform(-180, 180, 300)
+
+    ref = aero.distance(lat1[:, None], lon1[:, None], lat2, lon2)
+    assert np.allclose(aero.distance_matrix(lat1, lon1, lat2, lon2, block=7), ref)
+
+    dist, idx = aero.distance_matrix(lat1, lon1, lat2, lon2, k=3, block=7)
+    assert np.allclose(dist, np.sort(ref, axis=1)[:, :3])
+    assert np.allclose(np.take_along_axis(ref, idx, axis=1), dist)
+
+    i, j, d = aero.distance_matrix(lat1, lon1, lat2, lon2, threshold=1e6, block=7)
+    assert len(i) == np.sum(ref <= 1e6)
+    assert np.allclose(ref[i, j], d)
+
+    brg = aero.bearing_matrix(lat1, lon1, lat2, lon2, block=7)
+    diff = brg - aero.bearing(lat1[:, None], lon1[:, None], lat2, lon2)
+    assert np.allclose((diff + 180) % 360 - 180, 0)
+
+
+def test_great_circle_points():
+    lat1, lon1 = np.array([52.3, 10.0]), np.array([4.8, -170.0])
+    lat2, lon2 = np.array([40.6, 10.0]), np.array([-73.8, 170.0])
+
+    lat, lon, offsets = aero.great_circle_points(lat1, lon1, lat2, lon2, 50e3)
+    assert len(offsets) == 3
+
+    for i in range(2):
+        s = slice(offsets[i], offsets[i + 1])
+        assert lat[s][0] == lat1[i] and lon[s][-1] == lon2[i]
+        steps = aero.distance(lat[s][:-1], lon[s][:-1], lat[s][1:], lon[s][1:])
+        assert np.all(steps <= 50e3 + 1e-3)
+        d = aero.distance(lat1[i], lon1[i], lat2[i], lon2[i])
+        assert np.isclose(steps.sum(), d)
@@ -0,0 +1,94 @@
+import numpy as np
+from openap.extra import filters
+
+
+def test_sortxy():
+    f = filters.BaseFilter()
+    X, Y, Z = f.sortxy([3, 1, 2, 1], [30, 10, 20, 11], [0.3, 0.1, 0.2, 0.11])
+    assert list(X) == [1, 1, 2, 3]
+    assert list(Y) == [10, 11, 20, 30]
+    assert list(Z) == [0.1, 0.11, 0.2, 0.3]
+
+
+def test_simplefill():
+    f = filters.BaseFilter()
+    X, Y = f.simplefill([4, 0, 1, 6], [40, 0, 10, 60])
+    assert list(X) == [0, 1, 2, 3, 4, 5, 6]
+    assert list(Y) == [0, 10, 10, 10, 40, 40, 60]
+
+    X, Y, Z = f.simplefill([0.5, 2, 4], [5, 20, 40], [-5, -20, -40])
+    assert list(X) == [0, 1, 2, 3, 4]
+    assert list(Y) == [0, 0, 20, 20, 40]
+    assert list(Z) == [0, 0, -20, -20, -40]
+
+
+def test_twf():
+    X = np.cumsum(np.random.uniform(0.5, 2, 100))
+    Y = np.sin(X / 10) + np.random.normal(0, 0.1, 100)
+    Z = np.cos(X / 10)
+
+    twf = filters.TWF(window_size=10)
+    X1, Y1 = twf.filter(X, Y)
+    X2, Y2, Z2 = twf.filter(X, Y, Z)
+    assert np.array_equal(Y1, Y2)
+    assert np.array_equal(twf.filter(X, Z)[1], Z2)
+
+    # same as the sample by sample recursion
+    YF = Y.copy()
+    for i in range(2, len(X)):
+        if i < 10:
+            yw = np.average(YF[: i - 1])
+        else:
+            dX = X[i - 9 : i - 1] - X[i - 10 : i - 2]
+            yw = (YF[i - 2] - np.sum(YF[i - 10 : i - 2] / dX)) / (1 - np.sum(1 / dX))
+        YF[i] = (yw + Y[i]) / 2.0
+    assert np.allclose(Y1, YF, rtol=1e-12, atol=1e-12)
+
+    stream = filters.TWFStream(window_size=10)
+    Y3 = [stream.update(x, y) for x, y in zip(X, Y)]
+    assert np.allclose(Y1, Y3, rtol=1e-12, atol=1e-12)
+    assert len(stream.Xbuf) == 10
+
+    # flights stored back to back are filtered separately
+    X4 = np.r_[X, X[-1] + 60 + X[:30]]
+    YF = twf.filter_many(
+        np.vstack([np.r_[Y, Z[:30]], np.r_[Z, Y[:30]]]), [0, 100, 130], X=X4
+    )
+    assert np.allclose(YF[0, :100], Y1, rtol=1e-12, atol=1e-12)
+    assert np.allclose(YF[1, :100], Z2, rtol=1e-12, atol=1e-12)
+    assert np.allclose(
+        YF[0, 100:], twf.filter(X[:30], Z[:30])[1], rtol=1e-12, atol=1e-12
+    )
+
+
+def test_savitzkygolay():
+    X = np.arange(200)
+    Y = np.sin(X / 20) + np.random.normal(0, 0.1, 200)
+    Z = np.cos(X / 20)
+
+    sg = filters.SavitzkyGolay(window_size=11, order=2)
+    X1, Y1, Z1 = sg.filter(X, Y, Z)
+    assert np.allclose(Y1, np.sin(X / 20), atol=0.2)
+
+    # same coefficients for all instances
+    assert sg.coefficients(11, 2) is filters.SavitzkyGolay().coefficients(11, 2)
+
+    # flights stored back to back are filtered separately
+    YF = sg.filter_many(np.vstack([np.r_[Y, Z], np.r_[Z, Y]]), offsets=[0, 200, 400])
+    assert np.allclose(YF[0], np.r_[Y1, Z1])
+    assert np.allclose(YF[1], np.r_[Z1, Y1])
+
+
+def test_spline_segments():
+    X = np.arange(5000)
+    truth = 10000 * np.sin(X / 2000)
+    Y = truth + np.random.normal(0, 50, 5000)
+
+    X1, Y1 = filters.Spline(k=3).filter(X, Y)
+    X2, Y2 = filters.Spline(k=3, segment=1000).filter(X, Y)
+    assert np.array_equal(X1, X2)
+    assert np.sqrt(np.mean((Y1 - Y2) ** 2)) < 25
+    assert np.sqrt(np.mean((Y2 - truth) ** 2)) < 50
+
+    X3, Y3 = filters.Spline(k=3, i=True, segment=400).filter(X[::3], Y[::3])
+    assert len(X3) == len(Y3) == X[::3][-1]
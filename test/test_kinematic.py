@@ -1,3 +1,5 @@
+import json
+import pickle
 from openap import WRAP
 
 wrap = WRAP('A320')
@@ -6,3 +8,56 @@ for func in dir(wrap):
     if callable(getattr(wrap, func)):
         if not func.startswith('_'):
             print(getattr(wrap, func)())
+
+
+def test_shared_records():
+    other = WRAP('a320')
+    assert other._records is wrap._records
+    assert other.cruise_mach() == wrap.cruise_mach()
+
+    # plain dicts, independent of the shared records
+    res = wrap.cruise_mach()
+    assert type(res) is dict and type(res['statmodel_params']) is list
+    res['default'] = 0
+    assert wrap.cruise_mach()['default'] == 0.78
+    json.dumps(res)
+
+
+def test_pickle():
+    from openap.traj import gen
+
+    other = pickle.loads(pickle.dumps(wrap))
+    assert other._records is wrap._records
+    assert other.cruise_mach() == wrap.cruise_mach()
+
+    generator = pickle.loads(pickle.dumps(gen.Generator('a320')))
+    assert generator.wrap.cruise_alt() == wrap.cruise_alt()
+
+
+def test_sample():
+    samples = wrap.sample(['cl_v_cas_const', 'cr_v_mach_mean'], n=10000, rng=0)
+    assert list(samples.columns) == ['cl_v_cas_const', 'cr_v_mach_mean']
+    assert len(samples) == 10000
+
+    for var in samples:
+        r = wrap._get_var(var)
+        assert samples[var].between(r['minimum'], r['maximum']).all()
+        assert abs(samples[var].mean() - r['default']) < 0.05 * r['default']
+
+    assert samples.equals(wrap.sample(['cl_v_cas_const', 'cr_v_mach_mean'], 10000, 0))
+    assert wrap.sample(n=5).shape == (5, len(wrap._records))
+
+
+def test_sample_all_types():
+    import warnings
+    from openap import prop
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        for actype in prop.available_aircraft():
+            w = WRAP(ac=actype, use_synonym=True)
+            samples = w.sample(n=100, rng=0)
+            assert samples.shape == (100, len(w._records))
+            for var in samples:
+                r = w._get_var(var)
+                assert samples[var].between(r['minimum'], r['maximum']).all()
@@ -1,3 +1,4 @@
+import numpy as np
 from openap import nav
 
 print(nav.airport('Eham'))
@@ -15,3 +16,99 @@ def test_all():
 
     assert nav.fix('eh155') == [51.965556, 4.382778, 'EH155']
     assert nav.closest_fix(52.011, 4.357) == ([51.965556, 4.382778, 'EH155'], 2744)
+
+
+def test_spatial():
+    assert list(nav.closest_airport([52.011, 0], [4.357, 0])) == ['EHRD', None]
+
+    fixes, dist = nav.closest_fix([52.011, 52.011], [4.357, 4.357])
+    assert list(fixes['fix']) == ['EH155', 'EH155']
+    assert int(dist[0]) == nav.closest_fix(52.011, 4.357)[1]
+
+    codes, dist = nav.nearest_airports(52.3, 4.76, k=3)
+    assert codes[0] == 'EHAM' and list(dist) == sorted(dist)
+
+    df = nav.airports_within(52.3, 4.76, 30000)
+    assert 'EHAM' in df.icao.values and df.distance.max() <= 30000
+
+    df = nav.fixes_in_bbox(51, 4, 52.1, 4.2)
+    assert df.lat.between(51, 52.1).all() and df.lon.between(4, 4.2).all()
+
+
+def test_names():
+    ap = nav.airport(['eham', 'lalaland', 'LFPG'])
+    assert list(ap['icao']) == ['EHAM', None, 'LFPG']
+
+    assert nav.fix('nonexist') is None
+
+    df = nav.fix_candidates('abapo', 50, 5)
+    assert df.shape[0] > 1 and df.distance.is_monotonic_increasing
+    assert nav.fix('abapo', 50, 5) == df.iloc[0, :3].tolist()
+
+    fx = nav.fix(['abapo', 'eh155'], [50, 52], [5, 4])
+    assert list(fx['fix']) == ['ABAPO', 'EH155']
+    assert fx['lat'][0] == df.lat.iloc[0]
+
+
+def test_navaid():
+    spl = nav.navaid('spl', 52, 4)
+    assert spl['type'] in ('VOR', 'DME') and spl['freq'] == 108.4
+
+    vor, dist = nav.closest_navaid(52.3, 4.76, types='VOR')
+    assert vor['ident'] == 'SPL' and dist < 5000
+
+    df, dist = nav.closest_navaid([52.3, 48.0], [4.76, 2.0], types=['VOR', 'NDB'])
+    assert df.type.isin(['VOR', 'NDB']).all() and len(dist) == 2
+
+    df = nav.navaids_within(52.3, 4.76, 10000, types='ILS')
+    assert (df.airport == 'EHAM').all() and df.distance.max() <= 10000
+
+
+def test_assign_airports():
+    res = nav.assign_airports(
+        [52.31, 0], [4.75, 0], [500, 100], [51.47, 52.3], [-0.45, 4.7], [300, 20000]
+    )
+    assert list(res['origin']) == ['EHAM', None]
+    assert list(res['destination']) == ['EGLL', None]
+    assert 0 < res['origin_confidence'][0] <= 1
+    assert res['destination_confidence'][1] == 0
+
+
+def test_closest_airport_planar():
+    # ranked by planar distance in degrees, as the box scan of the table
+    airports = nav._get_airports()
+    lat = np.random.uniform(35, 60, 200)
+    lon = np.random.uniform(-10, 30, 200)
+
+    for la, lo, icao in zip(lat, lon, nav.closest_airport(lat, lon)):
+        df = airports[
+            airports['lat'].between(la - 2, la + 2)
+            & airports['lon'].between(lo - 2, lo + 2)
+        ]
+        if len(df) == 0:
+            assert icao is None
+            continue
+        dist2 = (df['lat'] - la) ** 2 + (df['lon'] - lo) ** 2
+        assert icao == df['icao'].values[np.argmin(dist2.values)]
+
+
+def test_glide_slope_heading():
+    navaids = nav._get_navaids()
+    gs = navaids[navaids['type'] == 'GS']
+    assert gs['heading'].iloc[0] == 281.7
+    assert np.allclose(gs['heading'], gs['heading'].round(3), rtol=0, atol=0)
+
+
+def test_nearest_shapes():
+    lat, lon = np.array([52.3, 48.9]), np.array([4.76, 2.5])
+
+    codes, dist = nav.nearest_airports(lat, lon, k=3)
+    assert codes.shape == dist.shape == (2, 3)
+    codes, dist = nav.nearest_airports(lat, lon, k=1)
+    assert codes.shape == dist.shape == (2,)
+
+    idents, dist = nav.nearest_navaids(52.3, 4.76, k=3)
+    assert idents.shape == dist.shape == (3,)
+    assert all(isinstance(i, str) for i in idents)
+    df = nav.navaids_within(52.3, 4.76, dist[-1] + 1)
+    assert set(idents) <= set(df['ident'])
@@ -0,0 +1,49 @@
+import numpy as np
+from openap.extra import online
+
+
+def test_moments():
+    x = np.random.normal(10, 2, 10000)
+    m = online.Moments().update(x[:3000])
+    m.merge(online.Moments().update(x[3000:]))
+    assert m.count == len(x)
+    assert np.isclose(m.mean, x.mean())
+    assert np.isclose(m.var, x.var())
+    assert m.min == x.min() and m.max == x.max()
+
+
+def test_quantile_sketch():
+    x = np.random.uniform(0, 1, 200000)
+    parts = [
+        online.QuantileSketch(seed=i).update(c) for i, c in enumerate(np.split(x, 4))
+    ]
+    sketch = parts[0]
+    for p in parts[1:]:
+        sketch.merge(p)
+    assert sketch.count == len(x)
+    assert sum(len(lv) for lv in sketch.levels) < 2000
+    q = np.array([0.05, 0.5, 0.95])
+    assert np.allclose(sketch.quantile(q), np.quantile(x, q), atol=0.02)
+
+
+def test_summary():
+    x = np.random.normal(100, 10, 100000)
+    parts = [
+        {"v": online.Summary(size=2000, seed=i).update(c)}
+        for i, c in enumerate(np.split(x, 10))
+    ]
+    summaries = online.merge(parts)
+    s = summaries["v"]
+    assert s.count == len(x)
+    assert len(s.reservoir.samples) == 2000
+
+    rec = online.records(summaries, ["norm", "gamma"])["v"]
+    assert np.isclose(rec["default"], x.mean())
+    assert np.allclose(
+        [rec["minimum"], rec["maximum"]], np.percentile(x, [5, 95]), rtol=0.02
+    )
+    assert rec["statmodel"] in ("norm", "gamma")
+    assert (
+        np.isclose(rec["statmodel_params"][0], 100, rtol=0.1)
+        or rec["statmodel"] == "gamma"
+    )
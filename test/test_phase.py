@@ -2,7 +2,7 @@ import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from openap import FlightPhase
+from openap import phase, FlightPhase, FlightPhaseStream
 
 root = os.path.dirname(os.path.realpath(__file__))
 
@@ -53,6 +53,126 @@ def test_segment():
     plt.show()
 
 
+def test_phaselabel():
+    assert len(labels) == len(ts)
+    assert labels[0] == 'GND'
+    assert labels[-1] == 'NA'
+    assert {'GND', 'CL', 'CR', 'DE'} <= set(labels)
+
+    # every sample of a time window shares the same label
+    twindows = ts // 60
+    for tw in np.unique(twindows):
+        assert len(set(np.array(labels)[twindows == tw])) == 1
+
+
+def test_phasecode():
+    codes = fp.phasecode()
+    assert codes.dtype == np.int8
+    assert codes is fp.phasecode()
+    assert fp.state_lable_names[codes].tolist() == labels
+
+    starts, ends, values = fp._segments()
+    assert starts[0] == 0 and ends[-1] == len(codes)
+    assert np.all(values[1:] != values[:-1])
+    assert np.array_equal(np.repeat(values, ends - starts), codes)
+
+
+def test_stream():
+    stream = FlightPhaseStream()
+
+    out = []
+    for i in range(0, len(ts), 50):
+        s = slice(i, i + 50)
+        n = len(ts[s])
+        keys = np.array(['a'] * n + ['b'] * n)
+        out.append(stream.update(keys, np.r_[ts[s], ts[s] + 10000], np.r_[alt[s], alt[s]],
+                                 np.r_[spd[s], spd[s]], np.r_[roc[s], roc[s]]))
+
+    assert len(stream) == 2
+    out.append(stream.flush())
+    assert len(stream) == 0
+
+    windows = {k: np.concatenate([o[k] for o in out]) for k in out[0]}
+    a = windows['key'] == 'a'
+    assert windows['count'][a].sum() == len(ts)
+    assert np.array_equal(windows['code'][a], windows['code'][~a])
+
+    # same labels as the full trajectory, except the last window
+    codes = fp.phasecode()
+    assert np.array_equal(windows['code'][a][:-1], codes[::60][:a.sum() - 1])
+
+    events = windows['event'][a]
+    assert events[0] == 'GND'
+    assert list(events[events != ''][[1, -1]]) == ['TO', 'LD']
+
+    # same windows when fed one sample at a time
+    stream = FlightPhaseStream()
+    out = [stream.update('a', *x) for x in zip(ts, alt, spd, roc)] + [stream.flush()]
+    single = {k: np.concatenate([o[k] for o in out]) for k in out[0]}
+    for k in single:
+        assert np.array_equal(single[k], windows[k][a])
+
+    # eviction of the least recently updated aircraft
+    stream = FlightPhaseStream(max_aircraft=1)
+    stream.update('x', 0, 0, 0, 0)
+    assert list(stream.update('y', 0, 0, 0, 0)['key']) == ['x']
+    assert 'y' in stream and 'x' not in stream
+
+
+def test_label_many():
+    # the test flight, a truncated copy, and a single sample flight
+    n = len(ts)
+    cols = [np.r_[x, x[: n // 2], x[:1]] for x in (ts, alt, spd, roc)]
+    offsets = [0, n, n + n // 2, n + n // 2 + 1]
+
+    codes = fp.label_many(*cols, offsets)
+    assert np.array_equal(codes[:n], fp.phasecode())
+
+    fp2 = FlightPhase()
+    fp2.set_trajectory(ts[: n // 2], alt[: n // 2], spd[: n // 2], roc[: n // 2])
+    assert np.array_equal(codes[n:-1], fp2.phasecode())
+
+    idx = fp.flight_phase_indices_many(*cols, offsets)
+    for i, f in enumerate([fp, fp2]):
+        expected = {k: -1 if v is None else v for k, v in f.flight_phase_indices().items()}
+        assert {k: v[i] for k, v in idx.items()} == expected
+    assert idx['END'][2] == 1
+
+
+def test_memberships():
+    # closed form membership functions, shared by all instances
+    assert FlightPhase().roc_zero is FlightPhase.roc_zero
+    assert not FlightPhase.alt_gnd.flags.writeable
+
+    alt_levels, spd_levels, roc_levels = fp._memberships(
+        np.array([0, 150, 12345.6]), np.array([0, 250.5, 599]), np.array([-500.25, 0, 300.05])
+    )
+    assert np.allclose(alt_levels[0], np.interp([0, 150, 12345.6], fp.alt_range, fp.alt_gnd))
+    assert np.allclose(spd_levels[1], np.interp([0, 250.5, 599], fp.spd_range, fp.spd_md))
+    assert np.allclose(roc_levels[1], np.interp([-500.25, 0, 300.05], fp.roc_range, fp.roc_plus))
+
+
+def test_lookup():
+    fpl = FlightPhase(lookup=True, cache=False)
+    fpl.set_trajectory(ts, alt, spd, roc)
+    labels_lookup = fpl.phaselabel()
+    assert np.mean(np.array(labels_lookup) == np.array(labels)) > 0.99
+
+    assert fpl.lookup_accuracy(n=10000)['agreement'] > 0.99
+
+
+def test_lookup_workers(tmp_path, monkeypatch):
+    # workers build their own table, and keep the cache setting
+    monkeypatch.setattr(phase, '_lookup', None)
+    monkeypatch.setattr(phase, 'dir_cache', str(tmp_path))
+
+    fpl = FlightPhase(lookup=True, cache=False)
+    cols = [np.r_[x, x] for x in (ts, alt, spd, roc)]
+    codes = fpl.label_many(*cols, [0, len(ts), 2 * len(ts)], workers=2)
+    assert np.mean(codes[:len(ts)] == fp.phasecode()) > 0.99
+    assert list(tmp_path.iterdir()) == []
+
+
 def test_phase():
     idx = fp.flight_phase_indices()
 
@@ -76,3 +196,11 @@ def test_phase():
 if __name__ == '__main__':
     test_segment()
     test_phase()
+
+
+def test_lookup_key(monkeypatch):
+    # the cached table is tied to the memberships and the grid
+    key = phase._lookup_key()
+    memberships = dict(phase.memberships, alt_gnd=(phase._zmf, 0, 300))
+    monkeypatch.setattr(phase, 'memberships', memberships)
+    assert phase._lookup_key() != key
@@ -0,0 +1,44 @@
+import numpy as np
+from openap.extra import statistics
+
+
+def test_fit():
+    data = np.random.normal(100, 10, 2000)
+
+    res = statistics.fit(data, ['norm', 'gamma'])
+    assert set(res) == {'norm', 'gamma'}
+    assert np.allclose(res['norm']['param'], (100, 10), rtol=0.1)
+    assert res['norm']['error'] < 0.1
+    assert len(res['norm']['pdfx']) == len(res['norm']['pdfy']) == 1000
+
+    # memoized on the data
+    again = statistics.fit(list(data), 'norm')
+    assert again['norm']['param'] == res['norm']['param']
+
+
+def test_fit_many():
+    datasets = {
+        'a': np.random.normal(0, 1, 500),
+        'b': np.random.beta(2, 5, 500),
+    }
+    res = statistics.fit_many(datasets, ['norm', 'beta'], workers=2)
+    assert set(res) == {'a', 'b'}
+
+    # fitted again in this process, not taken from the memo
+    statistics._memo.clear()
+    for name, data in datasets.items():
+        single = statistics.fit(data, ['norm', 'beta'])
+        for model in ('norm', 'beta'):
+            assert np.allclose(res[name][model]['param'], single[model]['param'])
+            assert res[name][model]['error'] == single[model]['error']
+
+
+def test_fitpdf():
+    data = np.random.gamma(2, 3, 1000)
+    res = statistics.fit(data, 'gamma')['gamma']
+    assert sorted(res) == ['dscale', 'error', 'param', 'pdfx', 'pdfy']
+
+    lazy = statistics.fit(data, 'gamma', pdf=False)['gamma']
+    assert 'pdfx' not in lazy
+    pdfx, pdfy = statistics.fitpdf('gamma', lazy['param'], lazy['dscale'])
+    assert np.array_equal(pdfx, res['pdfx']) and np.array_equal(pdfy, res['pdfy'])
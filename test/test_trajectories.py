@@ -0,0 +1,143 @@
+import numpy as np
+from openap import aero, Trajectories
+from openap.extra import filters
+from openap.trajectories import split_flights, preprocess
+
+
+def make_flights(n=5):
+    flights = []
+    for i in range(n):
+        m = 50 + 10 * i
+        flights.append(
+            {
+                "ts": np.arange(m) * 4.0,
+                "lat": 50 + np.cumsum(np.random.uniform(0, 0.01, m)),
+                "lon": 4 + np.cumsum(np.random.uniform(0, 0.01, m)),
+                "alt": np.linspace(0, 10000, m),
+                "spd": np.linspace(150, 300, m),
+                "roc": np.full(m, 1500.0),
+            }
+        )
+    return flights
+
+
+def test_derived():
+    flights = make_flights()
+    trajs = Trajectories.from_flights(flights)
+
+    assert len(trajs) == len(flights)
+    assert trajs.nsamples == sum(len(f["ts"]) for f in flights)
+
+    dist = trajs.distance()
+    trk = trajs.track()
+    acc = trajs.acceleration()
+    dt = trajs.dt()
+
+    for i, f in enumerate(flights):
+        s = slice(trajs.offsets[i], trajs.offsets[i + 1])
+
+        d = aero.distance(f["lat"][:-1], f["lon"][:-1], f["lat"][1:], f["lon"][1:])
+        assert np.allclose(dist[s], np.concatenate([[0], np.cumsum(d)]))
+
+        b = aero.bearing(f["lat"][:-1], f["lon"][:-1], f["lat"][1:], f["lon"][1:])
+        assert np.allclose(trk[s], np.concatenate([b[:1], b]))
+
+        a = np.diff(f["spd"]) * aero.kts / np.diff(f["ts"])
+        assert np.allclose(acc[s], np.concatenate([a[:1], a]))
+
+        assert dt[s][0] == 0 and np.allclose(dt[s][1:], 4)
+
+        assert np.array_equal(trajs.flight(i)["alt"], f["alt"])
+
+
+def test_split_flights():
+    # two flights with a turnaround on ground, a data gap, and another aircraft
+    alt = np.concatenate([np.zeros(10), np.full(100, 20000), np.zeros(10)])
+    ts = np.arange(120) * 10.0
+
+    ts_all = np.concatenate([ts, ts + 1200, ts + 5000, ts])
+    alt_all = np.tile(alt, 4)
+    icao = np.array(["a"] * 360 + ["b"] * 120)
+
+    perm = np.random.permutation(len(ts_all))
+    order, offsets = split_flights(icao[perm], ts_all[perm], alt=alt_all[perm])
+
+    assert len(offsets) == 5
+    assert set(icao[perm][order][offsets[:-1]]) == {"a", "b"}
+
+    trajs = Trajectories(ts_all[perm][order], offsets=offsets)
+    for f in trajs:
+        assert np.all(np.diff(f["ts"]) == 10)
+
+    # without ground states, the turnaround is not split
+    order, offsets = split_flights(icao, ts_all, alt=alt_all, gnd_alt=0)
+    assert len(offsets) == 4
+
+    # ground states of FlightPhase, a slow turnaround is split but not a fast
+    # low pass
+    spd = np.concatenate([np.full(10, 10), np.full(100, 250), np.full(10, 10)])
+    roc = np.zeros(120)
+    order, offsets = split_flights(
+        icao, ts_all, alt=alt_all, spd=np.tile(spd, 4), roc=np.tile(roc, 4)
+    )
+    assert len(offsets) == 5
+
+    spd[:10] = spd[-10:] = 150
+    order, offsets = split_flights(
+        icao, ts_all, alt=alt_all, spd=np.tile(spd, 4), roc=np.tile(roc, 4)
+    )
+    assert len(offsets) == 4
+
+
+def test_preprocess():
+    flights = make_flights()
+    offsets = np.concatenate([[0], np.cumsum([len(f["ts"]) for f in flights])])
+    data = {k: np.concatenate([f[k] for f in flights]) for k in flights[0]}
+
+    # shuffled samples within each flight, and a missing altitude
+    perm = np.concatenate(
+        [s + np.random.permutation(e - s) for s, e in zip(offsets[:-1], offsets[1:])]
+    )
+    data = {k: v[perm] for k, v in data.items()}
+    data["alt"][3] = np.nan
+
+    trajs = preprocess(offsets=offsets, dt=1, **data)
+    assert len(trajs) == len(flights)
+
+    for f, g in zip(flights, trajs):
+        assert np.allclose(np.diff(g["ts"]), 1)
+        assert g["ts"][0] == f["ts"][0] and g["ts"][-1] == f["ts"][-1]
+        for k in ("lat", "spd", "roc"):
+            assert np.allclose(g[k], np.interp(g["ts"], f["ts"], f[k]))
+        assert not np.isnan(g["alt"]).any()
+
+    smooth = preprocess(
+        offsets=offsets,
+        filters={"alt": filters.SavitzkyGolay(), "spd": filters.TWF()},
+        **data,
+    )
+    assert np.array_equal(smooth.offsets, trajs.offsets)
+    assert np.array_equal(smooth.roc, trajs.roc)
+    assert not np.array_equal(smooth.spd, trajs.spd)
+
+
+def test_preprocess_antimeridian():
+    # eastbound over the antimeridian, with noise to smooth
+    ts = np.arange(0, 600, 4.0)
+    lon = 179 + ts / 300 + np.random.normal(0, 0.001, len(ts))
+    lon = (lon + 180) % 360 - 180
+    lat = np.full(len(ts), 60.0)
+
+    trajs = preprocess(
+        ts,
+        lat=lat,
+        lon=lon,
+        offsets=[0, len(ts)],
+        filters={"lon": filters.SavitzkyGolay(), "lat": filters.TWF()},
+    )
+    g = trajs.flight(0)
+    assert np.all((g["lon"] >= -180) & (g["lon"] < 180))
+
+    truth = (179 + g["ts"] / 300 + 180) % 360 - 180
+    diff = (g["lon"] - truth + 180) % 360 - 180
+    assert np.abs(diff).max() < 0.01